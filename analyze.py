@@ -0,0 +1,160 @@
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from timeit import default_timer as timer
+import json
+import os
+import sys
+
+from core import PLAYERS, AI, Bitboard, Game, GameState, SearchConfig, parse_config
+
+analysis_ai = None
+
+
+def init_analysis_worker(tt_entries):
+    global analysis_ai
+    analysis_ai = AI(tt_entries)
+
+
+def square_coordinates(sq):
+    return None if sq is None else list(Bitboard.coordinates(sq))
+
+
+# best move of the position in line ("text player", anything after is ignored) with its score for
+# Game.P_MAX, principal variation and search effort, or the error if the line is not a position
+def analyze_position(line, config):
+    fields = line.split()
+    if len(fields) < 2 or fields[1] not in PLAYERS:
+        return {'error': 'expected a position and the player to move, got {!r}'.format(line.strip())}
+    try:
+        game_state = GameState.from_text(fields[0], PLAYERS[fields[1]])
+    except ValueError as e:
+        return {'error': str(e)}
+
+    result = {'position': fields[0], 'player': game_state.current_player}
+    if game_state.is_final_state():
+        score = game_state.count_occurrence(Game.P_MAX) - game_state.count_occurrence(Game.P_MIN)
+        result.update(move=None, score=score, pv=[], nodes=0, depth=0, method='final', seconds=0)
+        return result
+    if game_state.must_pass():
+        game_state = game_state.pass_turn()
+        result['pass'] = True
+
+    ai = analysis_ai
+    score, new_state = ai.make_move(game_state, config)
+    sq = game_state.played_square(new_state)
+
+    # the alpha-beta searches leave their principal variation in the transposition table
+    pv = []
+    if ai.stats.method in ('alpha_beta', 'pvs', 'aspiration', 'mtdf'):
+        pv = [pv_sq for _, pv_sq in ai.principal_variation(game_state, ai.stats.depth)]
+    elif ai.stats.method == 'mcts':
+        pv = ai.mcts.principal_variation()
+    if not pv or pv[0] != sq:
+        pv = [sq]
+
+    result.update(move=square_coordinates(sq), score=round(score, 2), pv=[square_coordinates(pv_sq) for pv_sq in pv],
+                  nodes=ai.stats.nodes, depth=ai.stats.depth, method=ai.stats.method,
+                  seconds=round(ai.stats.total_time, 4))
+    return result
+
+
+# yields (input index, result) for every line, in input order, or as soon as each is done when ordered
+# is False; at most pending lines are read ahead so that inputs of any size stream through
+def analyze(lines, config, workers=None, ordered=True, pending=None):
+    workers = workers or os.cpu_count() or 1
+    pending = pending or 4 * workers
+    lines = enumerate(lines)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_analysis_worker,
+                             initargs=(config.tt_entries,)) as pool:
+        def submit():
+            for idx, line in lines:
+                future = pool.submit(analyze_position, line, config)
+                future.idx = idx
+                return future
+            return None
+
+        futures = deque()
+        for _ in range(pending):
+            future = submit()
+            if future is None:
+                break
+            futures.append(future)
+
+        while futures:
+            if ordered:
+                done = [futures.popleft()]
+            else:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    futures.remove(future)
+
+            for future in done:
+                yield future.idx, future.result()
+                future = submit()
+                if future is not None:
+                    futures.append(future)
+
+
+def run_analysis(source, output, config, workers, ordered):
+    start = timer()
+    last_report = start
+    done = 0
+    nodes = 0
+    errors = 0
+
+    for idx, result in analyze(source, config, workers, ordered):
+        result = dict(index=idx, **result)
+        output.write(json.dumps(result) + '\n')
+        done += 1
+        nodes += result.get('nodes', 0)
+        errors += 'error' in result
+
+        now = timer()
+        if now - last_report >= 0.5:
+            last_report = now
+            print("\r{} positions, {:.1f} positions/sec".format(done, done / (now - start)),
+                  end="", file=sys.stderr, flush=True)
+
+    elapsed = timer() - start
+    print("\r{} positions ({} errors) in {:.1f} seconds, {:.1f} positions/sec, {:.0f} nodes/sec".format(
+        done, errors, elapsed, done / elapsed if elapsed else 0, nodes / elapsed if elapsed else 0), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Best move, score and principal variation of every position of a file')
+
+    parser.add_argument('positions', nargs='?', default='-',
+                        help='Lines of position text and player to move (1 or X, 2 or O), - for stdin')
+    parser.add_argument('--output', default='-', help='JSON lines file to write, - for stdout')
+    parser.add_argument('--depth', type=int, default=None, help='Search depth of every position')
+    parser.add_argument('--move-time-ms', dest='move_time_ms', type=int, default=None,
+                        help='Time budget of every position, alpha-beta deepens until it runs out')
+    parser.add_argument('--config', default='algorithm=1,level=4',
+                        help='Other search settings, e.g. algorithm=2,mcts_iterations=5000')
+    parser.add_argument('--workers', type=int, default=None, help='Processes analyzing positions')
+    parser.add_argument('--unordered', action='store_true',
+                        help='Write every result as soon as it is ready instead of in input order')
+
+    args = parser.parse_args()
+
+    # positions are already analyzed in parallel, searches stay in their process
+    try:
+        config = parse_config(args.config, SearchConfig(workers=1))
+    except ValueError as e:
+        parser.error(str(e))
+    if args.depth is not None:
+        config.level = args.depth
+    if args.move_time_ms is not None:
+        config.move_time_ms = args.move_time_ms
+
+    source = sys.stdin if args.positions == '-' else open(args.positions)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        run_analysis((line for line in source if line.strip()), output, config, args.workers, not args.unordered)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
@@ -0,0 +1,120 @@
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from timeit import default_timer as timer
+import math
+import random
+
+from core import AI, Game, GameState, SearchConfig, parse_config
+
+
+# every position after plies moves from the start, as (text, player to move), one of every set of
+# positions that are rotations or reflections of each other
+def generate_openings(plies):
+    positions = {GameState().canonical()[0]: GameState()}
+    for _ in range(plies):
+        next_positions = {}
+        for game_state in positions.values():
+            if game_state.must_pass():
+                game_state = game_state.pass_turn()
+            for new_state in game_state.generate_new_states():
+                next_positions[new_state.canonical()[0]] = new_state
+        positions = next_positions
+
+    return sorted((game_state.to_text(), game_state.current_player) for game_state in positions.values())
+
+
+# disc difference from the point of view of the player using first_config
+def play_game(text, current_player, first_config, second_config, first_player):
+    game_state = GameState.from_text(text, current_player)
+    second_player = game_state.opponent_player(first_player)
+    players = {
+        first_player: (AI(first_config.tt_entries), first_config),
+        second_player: (AI(second_config.tt_entries), second_config),
+    }
+
+    while not game_state.is_final_state():
+        if game_state.must_pass():
+            game_state = game_state.pass_turn()
+            continue
+
+        ai, config = players[game_state.current_player]
+        _, game_state = ai.make_move(game_state, config)
+
+    return game_state.count_occurrence(first_player) - game_state.count_occurrence(second_player)
+
+
+# Elo difference of a score fraction and its 95% confidence interval
+def elo_estimate(wins, draws, losses):
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+
+    # half a game away from a perfect score keeps the interval finite
+    def elo(fraction):
+        fraction = min(max(fraction, 0.5 / games), 1 - 0.5 / games)
+        return -400 * math.log10(1 / fraction - 1)
+
+    return elo(score), elo(score - margin), elo(score + margin)
+
+
+def run_arena(first_config, second_config, openings, workers):
+    wins = draws = losses = 0
+    start = timer()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for text, current_player in openings:
+            # every opening is played once with each color
+            for first_player in (Game.P_MAX, Game.P_MIN):
+                futures.append(pool.submit(play_game, text, current_player, first_config, second_config,
+                                           first_player))
+
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            if result > 0:
+                wins += 1
+            elif result < 0:
+                losses += 1
+            else:
+                draws += 1
+            print("\r{}/{} games".format(done, len(futures)), end="", flush=True)
+
+    print()
+    return wins, draws, losses, timer() - start
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Headless AI against AI matches')
+
+    parser.add_argument('--first', default='algorithm=1,level=3,evaluation=1',
+                        help='Settings of the first AI, e.g. algorithm=1,move_time_ms=50,evaluation=2')
+    parser.add_argument('--second', default='algorithm=1,level=3,evaluation=2',
+                        help='Settings of the second AI')
+    parser.add_argument('--plies', type=int, default=4, help='Length of the opening lines')
+    parser.add_argument('--openings', type=int, default=50, help='Number of openings, each played twice')
+    parser.add_argument('--seed', type=int, default=0, help='Seed used to pick the openings')
+    parser.add_argument('--workers', type=int, default=None, help='Processes playing games')
+
+    args = parser.parse_args()
+
+    # games already run in parallel, searches stay in their process
+    try:
+        first_config = parse_config(args.first, SearchConfig(workers=1))
+        second_config = parse_config(args.second, SearchConfig(workers=1))
+    except ValueError as e:
+        parser.error(str(e))
+
+    openings = generate_openings(args.plies)
+    if args.openings < len(openings):
+        openings = random.Random(args.seed).sample(openings, args.openings)
+
+    wins, draws, losses, elapsed = run_arena(first_config, second_config, openings, args.workers)
+    games = wins + draws + losses
+    elo, elo_low, elo_high = elo_estimate(wins, draws, losses)
+
+    print("First: {}".format(args.first))
+    print("Second: {}".format(args.second))
+    print("Wins {}, draws {}, losses {} for the first AI.".format(wins, draws, losses))
+    print("Elo difference {:+.0f} (95% interval {:+.0f} to {:+.0f}).".format(elo, elo_low, elo_high))
+    print("{} games in {:.1f} seconds, {:.2f} games/sec.".format(games, elapsed, games / elapsed))
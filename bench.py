@@ -0,0 +1,307 @@
+from argparse import ArgumentParser
+from timeit import default_timer as timer
+import json
+import os
+import platform
+import subprocess
+import sys
+
+from core import AI, Game, GameState, SearchConfig
+
+# midgame positions reached by seeded random play, Game.P_MAX to move
+POSITIONS = [
+    '-------------------X-X----OOOO----OOO-----XXXXX---X-------X-----',
+    '----------OO------OOO-X--OOOOO----OXX-O--O-XXX----XX-O---X----O-',
+    '-----X--X----XO--X-XOOO-OOXOXOO--OOXOX--XXXXXO---X----O-XXX-----',
+    '--OOOO----XOOO-X--XOOOOO-XOOOOOOX-OXXOOO--OOOOOX--OXO----O---O--',
+    '-XXXX-X---XOXXXX--OXXOOOOOOXXXOOOOXOXOO-OOOOX--O-OOXXX--XO-OOO--',
+]
+
+# (position with Game.P_MAX to move, leaf counts for depth 1, 2, ...), passes count as a ply and a finished
+# game as a leaf; the start position counts are the published ones, the others were checked against
+# the list based move generator this engine started with
+PERFT = [
+    (GameState().to_text(), [4, 12, 56, 244, 1396, 8200, 55092, 390216, 3005288]),
+    (POSITIONS[0], [7, 87, 680, 8447, 72325]),
+    (POSITIONS[1], [10, 78, 944, 8904, 117953]),
+    (POSITIONS[2], [9, 115, 1211, 15261, 172347]),
+    (POSITIONS[3], [10, 116, 1026, 11322, 94925]),
+    (POSITIONS[4], [8, 63, 466, 3152, 20984]),
+    ('OOOOX-X-OOOX-XX-OOXXXOXXOXOOOOXXX-OOOXXX--OOOXXX---OOXXO-XXXOOOO', [5, 39, 134, 910, 2547, 13700]),
+    ('-OOOOOOO-XXOXOOO--OOOXOO-OOOXOXOOOXXOXXOOOOOOOXO--XOO-XO--XOO-XO', [7, 56, 340, 2013, 9895, 43370]),
+]
+
+# (name, algorithm, deepening, positions) for the search benchmark, every search goes to SEARCH_DEPTH: a
+# single search, or iterative deepening from depth 1, which aspiration windows and MTD(f) need for their
+# guesses, counting the nodes of every iteration; positions is how many of POSITIONS are searched
+SEARCH_DEPTH = 5
+SEARCHES = [
+    ('mini_max', 0, False, 2),
+    ('alpha_beta', 1, False, len(POSITIONS)),
+    ('pvs', 3, False, len(POSITIONS)),
+    ('alpha_beta_id', 1, True, len(POSITIONS)),
+    ('pvs_id', 3, True, len(POSITIONS)),
+    ('aspiration', 4, True, len(POSITIONS)),
+    ('mtdf', 5, True, len(POSITIONS)),
+]
+
+
+def perft(game_state, depth):
+    if depth == 0:
+        return 1
+
+    moves = list(game_state.iter_moves())
+    if not moves:
+        if game_state.is_final_state():
+            return 1
+        game_state.apply_pass()
+        nodes = perft(game_state, depth - 1)
+        game_state.undo_move()
+        return nodes
+
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for sq, flipped in moves:
+        game_state.apply_move(sq, flipped)
+        nodes += perft(game_state, depth - 1)
+        game_state.undo_move()
+
+    return nodes
+
+
+def run_perft(max_depth):
+    rows = []
+    for idx, (text, counts) in enumerate(PERFT):
+        for depth, expected in enumerate(counts[:max_depth], 1):
+            start = timer()
+            nodes = perft(GameState.from_text(text, Game.P_MAX), depth)
+            elapsed = timer() - start
+            rows.append({'position': idx, 'depth': depth, 'nodes': nodes, 'expected': expected,
+                         'ok': nodes == expected, 'seconds': elapsed})
+
+    return rows
+
+
+# one search per entry of SEARCHES of each of its positions, without the endgame solver
+def run_search():
+    rows = []
+    for name, algorithm, deepening, positions in SEARCHES:
+        config = SearchConfig(algorithm=algorithm, level=SEARCH_DEPTH, move_time_ms=0, workers=1, endgame_empties=0)
+        elapsed = 0
+        position_nodes = []
+        scores = []
+        for text in POSITIONS[:positions]:
+            ai = AI()
+            game_state = GameState.from_text(text, Game.P_MAX)
+            start = timer()
+            if deepening:
+                ai.set_evaluation(config)
+                score, _ = ai.iterative_deepening(game_state, 0, algorithm, SEARCH_DEPTH)
+            else:
+                score, _ = ai.make_move(game_state, config)
+            elapsed += timer() - start
+            position_nodes.append(ai.nodes)
+            scores.append(round(score, 2))
+
+        nodes = sum(position_nodes)
+        rows.append({'name': name, 'depth': SEARCH_DEPTH, 'deepening': deepening, 'nodes': nodes,
+                     'position_nodes': position_nodes, 'seconds': elapsed, 'nps': nodes / elapsed, 'scores': scores})
+
+    return rows
+
+
+def run_all(perft_depth):
+    return {
+        'python': platform.python_version(),
+        'perft': run_perft(perft_depth),
+        'search': run_search(),
+    }
+
+
+# problems found in current compared to baseline: wrong perft counts and searches whose time grew
+# by more than threshold (0.1 for 10%), plus notes about changed node counts
+def compare(baseline, current, threshold):
+    failures = []
+    notes = []
+
+    for row in current['perft']:
+        if not row['ok']:
+            failures.append("perft position {} depth {}: {} nodes, expected {}".format(
+                row['position'], row['depth'], row['nodes'], row['expected']))
+
+    old_searches = {(row['name'], row['depth']): row for row in baseline['search']}
+    for row in current['search']:
+        old = old_searches.get((row['name'], row['depth']))
+        if old is None:
+            continue
+
+        change = row['seconds'] / old['seconds'] - 1
+        if change > threshold:
+            failures.append("{} depth {}: {:.3f}s -> {:.3f}s ({:+.1%})".format(
+                row['name'], row['depth'], old['seconds'], row['seconds'], change))
+        if row['nodes'] != old['nodes']:
+            notes.append("{} depth {}: {} -> {} nodes".format(row['name'], row['depth'], old['nodes'], row['nodes']))
+
+    return failures, notes
+
+
+def print_perft(rows):
+    print("{:>8} {:>6} {:>12} {:>12} {:>10} {:>6}".format('position', 'depth', 'nodes', 'expected', 'seconds', 'ok'))
+    for row in rows:
+        print("{:>8} {:>6} {:>12} {:>12} {:>10.3f} {:>6}".format(row['position'], row['depth'], row['nodes'],
+                                                                row['expected'], row['seconds'], str(row['ok'])))
+
+
+# nodes are also given relative to alpha-beta run the same way (single search or deepening) on the same
+# positions, whose scores every search must reproduce
+def print_search(rows):
+    reference = {row['deepening']: row for row in rows if row['name'] in ('alpha_beta', 'alpha_beta_id')}
+    print("{:>14} {:>6} {:>10} {:>10} {:>10} {:>10} {:>14} {:>12}".format(
+        'algorithm', 'depth', 'driver', 'nodes', 'seconds', 'nps', 'vs alpha_beta', 'same scores'))
+    for row in rows:
+        base = reference.get(row['deepening'])
+        ratio = same = '-'
+        if base:
+            base_nodes = sum(base['position_nodes'][:len(row['position_nodes'])])
+            ratio = "{:.1%}".format(row['nodes'] / base_nodes)
+            same = str(all(abs(a - b) <= 2 * AI.NULL_WINDOW for a, b in zip(row['scores'], base['scores'])))
+        print("{:>14} {:>6} {:>10} {:>10} {:>10.3f} {:>10.0f} {:>14} {:>12}".format(
+            row['name'], row['depth'], 'deepening' if row['deepening'] else 'single', row['nodes'], row['seconds'],
+            row['nps'], ratio, same))
+
+
+# modules timed by the startup benchmark: the engine alone, the command line game, the pygame board
+STARTUP_MODULES = ['core', 'game', 'gui']
+
+
+# best of repeats wall times of a fresh interpreter importing each module, and of one importing nothing;
+# module lists the heavy third party modules the import loaded
+def run_startup(repeats):
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+    rows = []
+    for module in [None] + STARTUP_MODULES:
+        code = 'import sys' if module is None else \
+            'import sys, {}; print(*sorted({{"numpy", "pygame"}} & set(sys.modules)))'.format(module)
+        best = None
+        for _ in range(repeats):
+            start = timer()
+            out = subprocess.run([sys.executable, '-c', code], cwd=here, env=env, check=True,
+                                 stdout=subprocess.PIPE, universal_newlines=True).stdout
+            elapsed = timer() - start
+            best = elapsed if best is None else min(best, elapsed)
+        rows.append({'module': module or '(python)', 'seconds': best, 'loads': out.split()})
+
+    return rows
+
+
+def print_startup(rows):
+    print("{:>10} {:>10} {:>10}  {}".format('import', 'ms', 'over bare', 'loads'))
+    for row in rows:
+        print("{:>10} {:>10.1f} {:>10.1f}  {}".format(row['module'], row['seconds'] * 1000,
+                                                     (row['seconds'] - rows[0]['seconds']) * 1000,
+                                                     ' '.join(row['loads']) or '-'))
+
+
+# time for one fixed depth search of every position, for each worker count
+def parallel_scaling(depth, workers_list, algorithm=1):
+    rows = []
+    for workers in workers_list:
+        ai = AI()
+        config = SearchConfig(algorithm=algorithm, level=depth, move_time_ms=0, workers=workers)
+
+        # start the pool before timing
+        ai.make_move(GameState.from_text(POSITIONS[0], Game.P_MAX), SearchConfig(algorithm=algorithm, level=2, move_time_ms=0, workers=workers))
+
+        ai.table.clear()
+        if ai.shared_table is not None:
+            ai.shared_table.clear()
+        ai.nodes = 0
+        start = timer()
+        for text in POSITIONS:
+            ai.make_move(GameState.from_text(text, Game.P_MAX), config)
+        elapsed = timer() - start
+        ai.close()
+
+        rows.append({'workers': workers, 'seconds': elapsed, 'nodes': ai.nodes})
+
+    for row in rows:
+        row['speedup'] = rows[0]['seconds'] / row['seconds']
+        row['efficiency'] = row['speedup'] * rows[0]['workers'] / row['workers']
+
+    return rows
+
+
+def print_parallel_scaling(rows):
+    print("{:>8} {:>10} {:>10} {:>8} {:>10}".format('workers', 'seconds', 'nodes', 'speedup', 'efficiency'))
+    for row in rows:
+        print("{:>8} {:>10.3f} {:>10} {:>8.2f} {:>10.0%}".format(row['workers'], row['seconds'], row['nodes'],
+                                                                row['speedup'], row['efficiency']))
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Reversi engine benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    parallel = commands.add_parser('parallel', help='Speedup of the root split search by worker count')
+    parallel.add_argument('--depth', type=int, default=6, help='Search depth')
+    parallel.add_argument('--workers', default='1,2,4,8', help='Comma separated worker counts')
+    parallel.add_argument('--algorithm', type=int, default=1,
+                          help='0 for mini max (root split), 1, 3, 4 or 5 for Lazy SMP with that algorithm')
+
+    perft_parser = commands.add_parser('perft', help='Leaf counts checked against known values')
+    perft_parser.add_argument('--depth', type=int, default=7, help='Deepest perft depth')
+
+    commands.add_parser('search', help='Nodes, time and nodes per second of every algorithm at one depth')
+
+    startup = commands.add_parser('startup', help='Import time of the engine and of the front ends')
+    startup.add_argument('--repeats', type=int, default=5, help='Fresh interpreters per module, the best counts')
+
+    run = commands.add_parser('run', help='Perft and search benchmarks as JSON')
+    run.add_argument('--perft-depth', type=int, default=7, help='Deepest perft depth')
+    run.add_argument('--output', default=None, help='JSON file, printed if missing')
+
+    compare_parser = commands.add_parser('compare', help='Check a run against a baseline run')
+    compare_parser.add_argument('baseline', help='JSON file of the baseline run')
+    compare_parser.add_argument('current', help='JSON file of the run to check')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='Tolerated slowdown, 0.1 for 10%%')
+
+    args = parser.parse_args()
+
+    if args.command == 'perft':
+        rows = run_perft(args.depth)
+        print_perft(rows)
+        if not all(row['ok'] for row in rows):
+            sys.exit(1)
+    elif args.command == 'search':
+        print_search(run_search())
+    elif args.command == 'startup':
+        print_startup(run_startup(args.repeats))
+    elif args.command == 'run':
+        results = run_all(args.perft_depth)
+        if args.output is None:
+            print(json.dumps(results, indent=2))
+        else:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+        if not all(row['ok'] for row in results['perft']):
+            sys.exit(1)
+    elif args.command == 'compare':
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+
+        failures, notes = compare(baseline, current, args.threshold)
+        for note in notes:
+            print("note:", note)
+        for failure in failures:
+            print("FAIL:", failure)
+        if failures:
+            sys.exit(1)
+        print("No regression.")
+    elif args.command == 'parallel':
+        workers_list = [int(nr) for nr in args.workers.split(',')]
+        print_parallel_scaling(parallel_scaling(args.depth, workers_list, args.algorithm))
@@ -0,0 +1,61 @@
+import mmap
+import struct
+
+
+# file layout: a header followed by entries sorted by position key, read in place through mmap so that
+# every process using the book shares the page cache instead of loading its own copy
+class OpeningBook:
+    MAGIC = b'RVBK'
+    VERSION = 2
+    HEADER = struct.Struct('<4sHI')  # magic, version, number of entries
+    ENTRY = struct.Struct('<QhB')  # GameState.canonical_hash key, score * 100, best square of the canonical position
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.size = OpeningBook.HEADER.unpack_from(self.data, 0)
+        if magic != OpeningBook.MAGIC or version != OpeningBook.VERSION:
+            self.close()
+            raise ValueError('{} is not an opening book of version {}'.format(path, OpeningBook.VERSION))
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def key_at(self, idx):
+        return struct.unpack_from('<Q', self.data, OpeningBook.HEADER.size + idx * OpeningBook.ENTRY.size)[0]
+
+    # (best square, score) stored for key, None if the position is not in the book
+    def lookup(self, key):
+        low = 0
+        high = self.size
+        while low < high:
+            mid = (low + high) // 2
+            if self.key_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+
+        if low == self.size:
+            return None
+
+        found, score, sq = OpeningBook.ENTRY.unpack_from(self.data, OpeningBook.HEADER.size + low * OpeningBook.ENTRY.size)
+        if found != key:
+            return None
+
+        return sq, score / 100
+
+
+# entries is a dict position key -> (best square, score)
+def write_book(path, entries):
+    with open(path, 'wb') as f:
+        f.write(OpeningBook.HEADER.pack(OpeningBook.MAGIC, OpeningBook.VERSION, len(entries)))
+        for key in sorted(entries):
+            sq, score = entries[key]
+            score = max(-32768, min(32767, round(score * 100)))
+            f.write(OpeningBook.ENTRY.pack(key, score, sq))
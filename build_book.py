@@ -0,0 +1,54 @@
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from timeit import default_timer as timer
+
+from book import write_book
+from core import AI, Bitboard, GameState, SearchConfig
+
+
+def search_position(text, current_player, config):
+    game_state = GameState.from_text(text, current_player)
+    score, new_state = AI(config.tt_entries).make_move(game_state, config)
+    key, symmetry = game_state.canonical_hash()
+    return key, Bitboard.SYMMETRY_SQUARES[symmetry][game_state.played_square(new_state)], score
+
+
+# searches every position at most plies moves away from the start, once for all its rotations and
+# reflections, returns key -> (best square, score)
+def build_book(plies, config, workers=None):
+    entries = {}
+    positions = {GameState().canonical_hash()[0]: GameState()}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for ply in range(plies + 1):
+            start = timer()
+            futures = [pool.submit(search_position, game_state.to_text(), game_state.current_player, config)
+                       for game_state in positions.values() if game_state.can_advance()]
+            for future in futures:
+                key, sq, score = future.result()
+                entries[key] = (sq, score)
+            print("ply {}: {} positions in {:.1f} seconds".format(ply, len(futures), timer() - start))
+
+            next_positions = {}
+            for game_state in positions.values():
+                for new_state in game_state.generate_new_states():
+                    next_positions[new_state.canonical_hash()[0]] = new_state
+            positions = next_positions
+
+    return entries
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Builds an opening book by searching every early position')
+
+    parser.add_argument('--output', default='reversi.book', help='Book file to write')
+    parser.add_argument('--plies', type=int, default=4, help='Book positions are at most this many moves deep')
+    parser.add_argument('--depth', type=int, default=6, help='Alpha-beta depth used for every position')
+    parser.add_argument('--workers', type=int, default=None, help='Processes searching positions')
+
+    args = parser.parse_args()
+
+    config = SearchConfig(algorithm=1, level=args.depth, move_time_ms=0, workers=1, endgame_empties=0)
+    entries = build_book(args.plies, config, args.workers)
+    write_book(args.output, entries)
+    print("{} positions written to {}".format(len(entries), args.output))
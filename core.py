@@ -0,0 +1,2354 @@
+from array import array
+from timeit import default_timer as timer
+import copy
+import math
+import random
+import struct
+import sys
+import threading
+import time
+
+from book import OpeningBook
+from patterns import PatternEvaluator, instance_indices, update_indices
+
+# the engine without a display: positions, move generation and search, quick to import in worker
+# processes and tools; game.py adds the console and pygame front ends. The process pool, the profilers
+# and NumPy are imported when first used
+
+np = None  # loaded by load_numpy, only batched MCTS playouts need NumPy
+
+dx = [-1, -1, -1, 0, 0, 1, 1, 1]
+dy = [-1, 0, 1, -1, 1, -1, 0, 1]
+
+
+class Game:
+    NR_ROW = 8
+    NR_COL = 8
+
+    P_MAX = 1
+    P_MIN = 2
+    EMPTY = 0
+
+    LEVEL = 1
+
+    # 0 for mini max, 1 for alpha-beta, 2 for Monte Carlo tree search, 3 for principal variation search,
+    # 4 for alpha-beta with aspiration windows, 5 for MTD(f)
+    ALGORITHM = 0
+
+    EVALUATION = 1  # 1 for GameState.get_score_1, 2 for GameState.get_score_2, 3 for GameState.get_score_3
+
+    PATTERNS_PATH = None  # weights of the pattern evaluation, see fit_patterns.py, None for untrained weights
+
+    MIN_SCORE = -101
+    MAX_SCORE = 101
+
+    TT_ENTRIES = 1 << 18  # transposition table size, kept across moves
+
+    MOVE_TIME_MS = 0  # per-move budget for alpha-beta and MCTS, 0 searches to a fixed Game.LEVEL
+
+    MCTS_ITERATIONS = 2000  # MCTS budget per move when there is no Game.MOVE_TIME_MS
+
+    MCTS_BATCH = 0  # random games played at once with NumPy from every new MCTS leaf, 0 plays one in Python
+
+    WORKERS = 1  # processes sharing a search, see AI.lazy_smp
+
+    ENDGAME_EMPTIES = 12  # positions with at most this many empty cells are solved exactly, 0 disables
+
+    BOOK_PATH = None  # opening book consulted before searching, see build_book.py
+
+    PONDER = False  # search the human's possible moves while they think
+
+    STATS = False  # print search statistics after every AI move
+
+    RECORD_PATH = None  # record file every game is appended to, see records.py
+
+    RECORD_POSITIONS = False  # also record the position before every move, 8x8 boards only
+
+    def __init__(self):
+        pass
+
+
+# snapshot of the Game search settings, handed explicitly to worker processes
+class SearchConfig:
+    def __init__(self, algorithm=None, level=None, move_time_ms=None, tt_entries=None, workers=None,
+                 endgame_empties=None, evaluation=None, book_path=None, patterns_path=None, mcts_iterations=None,
+                 mcts_batch=None):
+        self.algorithm = Game.ALGORITHM if algorithm is None else algorithm
+        self.evaluation = Game.EVALUATION if evaluation is None else evaluation
+        self.level = Game.LEVEL if level is None else level
+        self.move_time_ms = Game.MOVE_TIME_MS if move_time_ms is None else move_time_ms
+        self.tt_entries = Game.TT_ENTRIES if tt_entries is None else tt_entries
+        self.workers = Game.WORKERS if workers is None else workers
+        self.endgame_empties = Game.ENDGAME_EMPTIES if endgame_empties is None else endgame_empties
+        self.book_path = Game.BOOK_PATH if book_path is None else book_path
+        self.patterns_path = Game.PATTERNS_PATH if patterns_path is None else patterns_path
+        self.mcts_iterations = Game.MCTS_ITERATIONS if mcts_iterations is None else mcts_iterations
+        self.mcts_batch = Game.MCTS_BATCH if mcts_batch is None else mcts_batch
+
+
+# SearchConfig arguments a description of settings may give, see parse_config
+CONFIG_KEYS = ('algorithm', 'level', 'move_time_ms', 'evaluation', 'endgame_empties', 'tt_entries', 'patterns_path',
+               'mcts_iterations', 'mcts_batch')
+
+# CONFIG_KEYS whose value is kept as a string
+PATH_KEYS = ('patterns_path',)
+
+# (smallest, largest or None) of every other CONFIG_KEYS value
+CONFIG_RANGES = {
+    'algorithm': (0, 5),
+    'level': (1, None),
+    'move_time_ms': (0, None),
+    'evaluation': (1, 3),
+    'endgame_empties': (0, None),
+    'tt_entries': (1, None),
+    'mcts_iterations': (1, None),
+    'mcts_batch': (0, None),
+}
+
+# the player to move as written after a position, see GameState.to_text
+PLAYERS = {'1': Game.P_MAX, 'X': Game.P_MAX, '2': Game.P_MIN, 'O': Game.P_MIN}
+
+
+# "algorithm=1,level=3,evaluation=2" -> a copy of config, or of the Game defaults, with these settings;
+# raises ValueError naming the first wrong one
+def parse_config(description, config=None):
+    config = SearchConfig() if config is None else copy.copy(config)
+    for item in description.split(','):
+        if not item:
+            continue
+        key, _, value = item.partition('=')
+        if key not in CONFIG_KEYS:
+            raise ValueError('unknown setting {}, expected one of {}'.format(key, ', '.join(CONFIG_KEYS)))
+        if key in PATH_KEYS:
+            setattr(config, key, value)
+            continue
+
+        try:
+            number = int(value)
+        except ValueError:
+            raise ValueError('{} expects a number'.format(key))
+        low, high = CONFIG_RANGES[key]
+        if high is None and number < low:
+            raise ValueError('{} expects a number of at least {}'.format(key, low))
+        if high is not None and not low <= number <= high:
+            raise ValueError('{} expects a number from {} to {}'.format(key, low, high))
+        setattr(config, key, number)
+
+    return config
+
+
+class Bitboard:
+    # a board is an int with bit (i * Game.NR_COL + j) set for cell (i, j)
+    SQUARES = 0  # cells on the board, also the largest final disc difference
+    FULL = 0
+    EDGES = 0
+    CORNERS = 0
+    X_SQUARES = 0  # diagonal neighbours of the corners
+    C_SQUARES = 0  # edge neighbours of the corners
+    QUADRANTS = []  # the board split in four, used for parity ordering in the endgame
+    WEIGHTS = []  # per square, weight of a disc in GameState.get_score_1
+    START = {}  # player -> discs of the start position, the four center cells
+
+    # (shift, mask) for every direction in dx / dy, split by shift sign
+    LEFT_SHIFTS = []
+    RIGHT_SHIFTS = []
+
+    # rotations and reflections: per symmetry, the square every square moves to and back; the last four
+    # transpose the board and only exist when it is square
+    SYMMETRY_SQUARES = []
+    INVERSE_SQUARES = []
+
+    # per symmetry, per byte of a board, the transformed bits for every byte value
+    SYMMETRY_TABLES = []
+
+    REVERSED_BITS = bytes(int('{:08b}'.format(b)[::-1], 2) for b in range(256))
+
+    @staticmethod
+    def setup(nr_row, nr_col):
+        Bitboard.SQUARES = nr_row * nr_col
+        Bitboard.FULL = (1 << (nr_row * nr_col)) - 1
+
+        first_col = last_col = 0
+        first_row = last_row = 0
+        for i in range(nr_row):
+            first_col |= 1 << (i * nr_col)
+            last_col |= 1 << (i * nr_col + nr_col - 1)
+        for j in range(nr_col):
+            first_row |= 1 << j
+            last_row |= 1 << ((nr_row - 1) * nr_col + j)
+
+        Bitboard.EDGES = first_col | last_col | first_row | last_row
+        Bitboard.CORNERS = (first_col | last_col) & (first_row | last_row)
+
+        Bitboard.X_SQUARES = Bitboard.C_SQUARES = 0
+        for i, j, di, dj in ((0, 0, 1, 1), (0, nr_col - 1, 1, -1),
+                             (nr_row - 1, 0, -1, 1), (nr_row - 1, nr_col - 1, -1, -1)):
+            Bitboard.X_SQUARES |= 1 << ((i + di) * nr_col + j + dj)
+            Bitboard.C_SQUARES |= (1 << ((i + di) * nr_col + j)) | (1 << (i * nr_col + j + dj))
+
+        Bitboard.WEIGHTS = []
+        for sq in range(nr_row * nr_col):
+            bit = 1 << sq
+            Bitboard.WEIGHTS.append(1 + (bit & Bitboard.EDGES != 0) + 2 * (bit & Bitboard.CORNERS != 0))
+
+        i = nr_row // 2 - 1
+        j = nr_col // 2 - 1
+        Bitboard.START = {
+            Game.P_MAX: (1 << (i * nr_col + j)) | (1 << ((i + 1) * nr_col + j + 1)),
+            Game.P_MIN: (1 << (i * nr_col + j + 1)) | (1 << ((i + 1) * nr_col + j)),
+        }
+
+        Bitboard.QUADRANTS = [0, 0, 0, 0]
+        for i in range(nr_row):
+            for j in range(nr_col):
+                quadrant = 2 * (2 * i >= nr_row) + (2 * j >= nr_col)
+                Bitboard.QUADRANTS[quadrant] |= 1 << (i * nr_col + j)
+
+        last_row_idx = nr_row - 1
+        last_col_idx = nr_col - 1
+        moves = [
+            lambda i, j: (i, j),
+            lambda i, j: (i, last_col_idx - j),
+            lambda i, j: (last_row_idx - i, j),
+            lambda i, j: (last_row_idx - i, last_col_idx - j),
+            lambda i, j: (j, i),
+            lambda i, j: (j, last_col_idx - i),
+            lambda i, j: (last_row_idx - j, i),
+            lambda i, j: (last_row_idx - j, last_col_idx - i),
+        ]
+        if nr_row != nr_col:
+            moves = moves[:4]
+
+        Bitboard.SYMMETRY_SQUARES = []
+        Bitboard.INVERSE_SQUARES = []
+        Bitboard.SYMMETRY_TABLES = []
+        nr_bytes = (nr_row * nr_col + 7) // 8
+        for move in moves:
+            squares = [0] * (nr_row * nr_col)
+            for i in range(nr_row):
+                for j in range(nr_col):
+                    x, y = move(i, j)
+                    squares[i * nr_col + j] = x * nr_col + y
+            inverse = [0] * len(squares)
+            for sq, moved in enumerate(squares):
+                inverse[moved] = sq
+            Bitboard.SYMMETRY_SQUARES.append(squares)
+            Bitboard.INVERSE_SQUARES.append(inverse)
+
+            tables = []
+            for idx in range(nr_bytes):
+                table = [0] * 256
+                for value in range(1, 256):
+                    low = value & -value
+                    sq = idx * 8 + low.bit_length() - 1
+                    table[value] = table[value ^ low] | (1 << squares[sq] if sq < len(squares) else 0)
+                tables.append(table)
+            Bitboard.SYMMETRY_TABLES.append(tables)
+
+        Bitboard.LEFT_SHIFTS = []
+        Bitboard.RIGHT_SHIFTS = []
+        for k in range(8):
+            # bits shifted across a row boundary land in the opposite column
+            mask = Bitboard.FULL
+            if dy[k] == 1:
+                mask &= ~first_col
+            elif dy[k] == -1:
+                mask &= ~last_col
+
+            shift = dx[k] * nr_col + dy[k]
+            if shift > 0:
+                Bitboard.LEFT_SHIFTS.append((shift, mask))
+            else:
+                Bitboard.RIGHT_SHIFTS.append((-shift, mask))
+
+    @staticmethod
+    def square(x, y):
+        return x * Game.NR_COL + y
+
+    # cell (i, j) of the result is cell (j, i) of b, 8x8 boards only
+    @staticmethod
+    def transpose8(b):
+        t = (b ^ (b >> 7)) & 0x00AA00AA00AA00AA
+        b ^= t ^ (t << 7)
+        t = (b ^ (b >> 14)) & 0x0000CCCC0000CCCC
+        b ^= t ^ (t << 14)
+        t = (b ^ (b >> 28)) & 0x00000000F0F0F0F0
+        b ^= t ^ (t << 28)
+        return b
+
+    # b moved by every symmetry, in the order of SYMMETRY_SQUARES
+    @staticmethod
+    def symmetries(b):
+        if Game.NR_ROW == 8 and Game.NR_COL == 8:
+            # rows are bytes: reversing the bytes flips the board, reversing the bits of every byte mirrors it
+            rows = b.to_bytes(8, 'little')
+            mirrored = rows.translate(Bitboard.REVERSED_BITS)
+            t_rows = Bitboard.transpose8(b).to_bytes(8, 'little')
+            t_mirrored = t_rows.translate(Bitboard.REVERSED_BITS)
+            return [int.from_bytes(rows, 'little'), int.from_bytes(mirrored, 'little'),
+                    int.from_bytes(rows, 'big'), int.from_bytes(mirrored, 'big'),
+                    int.from_bytes(t_rows, 'little'), int.from_bytes(t_mirrored, 'little'),
+                    int.from_bytes(t_rows, 'big'), int.from_bytes(t_mirrored, 'big')]
+
+        data = b.to_bytes(len(Bitboard.SYMMETRY_TABLES[0]), 'little')
+        boards = []
+        for tables in Bitboard.SYMMETRY_TABLES:
+            moved = 0
+            for table, byte in zip(tables, data):
+                moved |= table[byte]
+            boards.append(moved)
+
+        return boards
+
+    @staticmethod
+    def coordinates(sq):
+        return sq // Game.NR_COL, sq % Game.NR_COL
+
+    @staticmethod
+    def squares(mask):
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    @staticmethod
+    def legal_moves(own, opp):
+        empty = Bitboard.FULL & ~(own | opp)
+        moves = 0
+
+        for shift, mask in Bitboard.LEFT_SHIFTS:
+            inner = opp & mask
+            run = t = (own << shift) & inner
+            while t:
+                t = (t << shift) & inner
+                run |= t
+            moves |= (run << shift) & mask
+
+        for shift, mask in Bitboard.RIGHT_SHIFTS:
+            inner = opp & mask
+            run = t = (own >> shift) & inner
+            while t:
+                t = (t >> shift) & inner
+                run |= t
+            moves |= (run >> shift) & mask
+
+        return moves & empty
+
+    # discs of opp flipped by own playing on the empty square sq
+    @staticmethod
+    def flips(own, opp, sq):
+        move = 1 << sq
+        flipped = 0
+
+        for shift, mask in Bitboard.LEFT_SHIFTS:
+            line = 0
+            t = (move << shift) & mask
+            while t & opp:
+                line |= t
+                t = (t << shift) & mask
+            if t & own:
+                flipped |= line
+
+        for shift, mask in Bitboard.RIGHT_SHIFTS:
+            line = 0
+            t = (move >> shift) & mask
+            while t & opp:
+                line |= t
+                t = (t >> shift) & mask
+            if t & own:
+                flipped |= line
+
+        return flipped
+
+
+if hasattr(int, 'bit_count'):
+    popcount = int.bit_count
+else:
+    def popcount(x):
+        return bin(x).count('1')
+
+
+# imports NumPy on first use so that processes not using it do not pay for it, None if it is missing
+def load_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return None
+        np = numpy
+    return np
+
+
+# popcount of every element of an array of np.uint64
+def bitwise_count(a):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(a)
+    return np.unpackbits(a.view(np.uint8)).reshape(len(a), -1).sum(axis=1)
+
+
+class Zobrist:
+    SEED = 0x5EED  # fixed so that hashes are stable between runs
+
+    KEYS = {}  # player -> one random key per square
+    FLIP = []  # KEYS[Game.P_MAX][sq] ^ KEYS[Game.P_MIN][sq]
+    SIDE = 0  # xored in when Game.P_MIN is to move
+
+    @staticmethod
+    def setup(nr_row, nr_col):
+        rng = random.Random(Zobrist.SEED)
+        squares = nr_row * nr_col
+        Zobrist.KEYS = {
+            Game.P_MAX: [rng.getrandbits(64) for _ in range(squares)],
+            Game.P_MIN: [rng.getrandbits(64) for _ in range(squares)],
+        }
+        Zobrist.FLIP = [Zobrist.KEYS[Game.P_MAX][sq] ^ Zobrist.KEYS[Game.P_MIN][sq] for sq in range(squares)]
+        Zobrist.SIDE = rng.getrandbits(64)
+
+    @staticmethod
+    def hash(boards, current_player):
+        h = Zobrist.SIDE if current_player == Game.P_MIN else 0
+        for player in (Game.P_MAX, Game.P_MIN):
+            keys = Zobrist.KEYS[player]
+            for sq in Bitboard.squares(boards[player]):
+                h ^= keys[sq]
+
+        return h
+
+    # hash after player puts a disc on sq and flips the discs in flipped
+    @staticmethod
+    def update(h, player, sq, flipped):
+        h ^= Zobrist.KEYS[player][sq] ^ Zobrist.SIDE
+        while flipped:
+            low = flipped & -flipped
+            h ^= Zobrist.FLIP[low.bit_length() - 1]
+            flipped ^= low
+
+        return h
+
+
+# board size of every game created from now on in this process, AI.get_pool hands it to its workers
+def setup_board(nr_row, nr_col):
+    if nr_row < 4 or nr_col < 4 or nr_row % 2 or nr_col % 2:
+        raise ValueError('a board needs an even number of rows and columns, at least 4 of each')
+
+    Game.NR_ROW = nr_row
+    Game.NR_COL = nr_col
+    Bitboard.setup(nr_row, nr_col)
+    Zobrist.setup(nr_row, nr_col)
+
+
+setup_board(Game.NR_ROW, Game.NR_COL)
+
+
+class GameState:
+    def __init__(self, current_player=Game.P_MAX, grid=None, boards=None, zobrist_hash=None):
+        self.current_player = current_player
+
+        if boards is not None:
+            self.boards = dict(boards)
+        elif grid is None:
+            self.boards = dict(Bitboard.START)
+        else:
+            self.boards = {Game.P_MAX: 0, Game.P_MIN: 0}
+            for i in range(Game.NR_ROW):
+                for j in range(Game.NR_COL):
+                    if grid[i][j] != Game.EMPTY:
+                        self.boards[grid[i][j]] |= 1 << Bitboard.square(i, j)
+
+        if zobrist_hash is None:
+            zobrist_hash = Zobrist.hash(self.boards, self.current_player)
+        self.hash = zobrist_hash
+
+        # (square, flipped discs, previous hash) for every apply_move not yet undone
+        self.history = []
+
+        # player -> legal moves, valid while self.hash == self.moves_hash
+        self.moves = {}
+        self.moves_hash = None
+
+        # evaluation terms per player, kept up to date by apply_move and undo_move
+        self.counts = {}  # discs
+        self.weights = {}  # discs weighted as in get_score_1
+        self.corners = {}  # corners owned
+        for player in (Game.P_MAX, Game.P_MIN):
+            board = self.boards[player]
+            self.counts[player] = popcount(board)
+            self.weights[player] = popcount(board) + popcount(board & Bitboard.EDGES) + 2 * popcount(board & Bitboard.CORNERS)
+            self.corners[player] = popcount(board & Bitboard.CORNERS)
+
+        # pattern instance indices, only kept up to date once track_patterns was called
+        self.pattern_indices = None
+
+    def copy(self):
+        return GameState(self.current_player, boards=self.boards, zobrist_hash=self.hash)
+
+    # every position of a game played from the start position, moves are squares with None for a pass
+    @staticmethod
+    def replay(moves):
+        game_state = GameState()
+        yield game_state
+        for sq in moves:
+            game_state = game_state.pass_turn() if sq is None else game_state.play(sq)
+            yield game_state
+
+    # (key, symmetry): the key is shared by all rotations and reflections of the position, and
+    # Bitboard.SYMMETRY_SQUARES[symmetry] moves the squares of this position to those of the smallest one
+    def canonical(self):
+        shift = Game.NR_ROW * Game.NR_COL
+        side = 1 if self.current_player == Game.P_MIN else 0
+        best_key = None
+        best_symmetry = 0
+        p_max_boards = Bitboard.symmetries(self.boards[Game.P_MAX])
+        p_min_boards = Bitboard.symmetries(self.boards[Game.P_MIN])
+        for symmetry, (p_max_board, p_min_board) in enumerate(zip(p_max_boards, p_min_boards)):
+            key = (p_max_board << (shift + 1)) | (p_min_board << 1) | side
+            if best_key is None or key < best_key:
+                best_key = key
+                best_symmetry = symmetry
+
+        return best_key, best_symmetry
+
+    # canonical with the Zobrist hash of the smallest position as a 64 bit key
+    def canonical_hash(self):
+        key, symmetry = self.canonical()
+        shift = Game.NR_ROW * Game.NR_COL
+        boards = {Game.P_MAX: key >> (shift + 1), Game.P_MIN: (key >> 1) & Bitboard.FULL}
+        return Zobrist.hash(boards, self.current_player), symmetry
+
+    # one character per cell in raster order, 'X' for Game.P_MAX, 'O' for Game.P_MIN and '-' if empty
+    def to_text(self):
+        cells = {Game.P_MAX: 'X', Game.P_MIN: 'O', Game.EMPTY: '-'}
+        return ''.join(cells[cell] for line in self.grid for cell in line)
+
+    @staticmethod
+    def from_text(text, current_player=Game.P_MAX):
+        cells = {'X': Game.P_MAX, 'O': Game.P_MIN, '-': Game.EMPTY}
+        if len(text) != Game.NR_ROW * Game.NR_COL or any(ch not in cells for ch in text):
+            raise ValueError('bad position {!r}'.format(text))
+
+        grid = [[cells[text[i * Game.NR_COL + j]] for j in range(Game.NR_COL)] for i in range(Game.NR_ROW)]
+        return GameState(current_player, grid)
+
+    # list of lists view of the board, built on demand
+    @property
+    def grid(self):
+        p_max_board = self.boards[Game.P_MAX]
+        p_min_board = self.boards[Game.P_MIN]
+        grid = []
+        for i in range(Game.NR_ROW):
+            line = []
+            for j in range(Game.NR_COL):
+                bit = 1 << Bitboard.square(i, j)
+                if p_max_board & bit:
+                    line.append(Game.P_MAX)
+                elif p_min_board & bit:
+                    line.append(Game.P_MIN)
+                else:
+                    line.append(Game.EMPTY)
+            grid.append(line)
+
+        return grid
+
+    def opponent(self):
+        if self.current_player == Game.P_MAX:
+            return Game.P_MIN
+        else:
+            return Game.P_MAX
+
+    def opponent_player(self, player):
+        if player == Game.P_MAX:
+            return Game.P_MIN
+        else:
+            return Game.P_MAX
+
+    def switch_player(self):
+        self.current_player = self.opponent()
+
+    def legal_moves(self, player=None):
+        if player is None:
+            player = self.current_player
+
+        if self.moves_hash != self.hash:
+            self.moves = {}
+            self.moves_hash = self.hash
+        moves = self.moves.get(player)
+        if moves is None:
+            moves = Bitboard.legal_moves(self.boards[player], self.boards[self.opponent_player(player)])
+            self.moves[player] = moves
+
+        return moves
+
+    def valid_move(self, x, y, player):
+        if x < 0 or y < 0 or x >= Game.NR_ROW or y >= Game.NR_COL:
+            return False, []
+
+        sq = Bitboard.square(x, y)
+        own = self.boards[player]
+        opp = self.boards[self.opponent_player(player)]
+        if (own | opp) >> sq & 1:
+            return False, []
+
+        flipped = Bitboard.flips(own, opp, sq)
+        if flipped == 0:
+            return False, []
+
+        opponent_disks = [[x, y]]
+        for k in Bitboard.squares(flipped):
+            opponent_disks.append(list(Bitboard.coordinates(k)))
+
+        return True, opponent_disks
+
+    def count_moves(self, player):
+        return popcount(self.legal_moves(player))
+
+    def can_advance(self):
+        return self.legal_moves() != 0
+
+    # a player without moves passes, the game ends when neither player can move
+    def is_final_state(self):
+        return not self.can_advance() and self.legal_moves(self.opponent()) == 0
+
+    def must_pass(self):
+        return not self.can_advance() and not self.is_final_state()
+
+    def generate_new_state(self, sq, flipped):
+        own = self.boards[self.current_player] | flipped | (1 << sq)
+        opp = self.boards[self.opponent()] & ~flipped
+
+        zobrist_hash = Zobrist.update(self.hash, self.current_player, sq, flipped)
+
+        return GameState(self.opponent(), boards={self.current_player: own, self.opponent(): opp},
+                         zobrist_hash=zobrist_hash)
+
+    def play(self, sq):
+        flipped = Bitboard.flips(self.boards[self.current_player], self.boards[self.opponent()], sq)
+        return self.generate_new_state(sq, flipped)
+
+    def generate_new_states(self):
+        new_states = []
+
+        own = self.boards[self.current_player]
+        opp = self.boards[self.opponent()]
+        for sq in Bitboard.squares(self.legal_moves()):
+            new_states.append(self.generate_new_state(sq, Bitboard.flips(own, opp, sq)))
+
+        return new_states
+
+    # lazily yields (square, flipped discs) for every legal move of the current player
+    def iter_moves(self):
+        own = self.boards[self.current_player]
+        opp = self.boards[self.opponent()]
+        for sq in Bitboard.squares(self.legal_moves()):
+            yield sq, Bitboard.flips(own, opp, sq)
+
+    # plays sq in place, must be reverted with undo_move
+    def apply_move(self, sq, flipped=None):
+        player = self.current_player
+        opponent = self.opponent()
+        if flipped is None:
+            flipped = Bitboard.flips(self.boards[player], self.boards[opponent], sq)
+
+        self.boards[player] |= flipped | (1 << sq)
+        self.boards[opponent] &= ~flipped
+        self.current_player = opponent
+        self.history.append((sq, flipped, self.hash))
+        self.hash = Zobrist.update(self.hash, player, sq, flipped)
+
+        # a corner can never be flipped
+        nr = popcount(flipped)
+        weight = nr + popcount(flipped & Bitboard.EDGES)
+        self.counts[player] += nr + 1
+        self.counts[opponent] -= nr
+        self.weights[player] += weight + Bitboard.WEIGHTS[sq]
+        self.weights[opponent] -= weight
+        if (1 << sq) & Bitboard.CORNERS:
+            self.corners[player] += 1
+        if self.pattern_indices is not None:
+            update_indices(self.pattern_indices, player == Game.P_MAX, sq, flipped)
+
+    # gives the turn away in place when the current player has no move, reverted with undo_move
+    def apply_pass(self):
+        self.history.append((None, 0, self.hash))
+        self.hash ^= Zobrist.SIDE
+        self.switch_player()
+
+    def undo_move(self):
+        sq, flipped, self.hash = self.history.pop()
+        self.switch_player()
+        if sq is None:
+            return
+
+        player = self.current_player
+        opponent = self.opponent()
+        self.boards[player] &= ~(flipped | (1 << sq))
+        self.boards[opponent] |= flipped
+
+        nr = popcount(flipped)
+        weight = nr + popcount(flipped & Bitboard.EDGES)
+        self.counts[player] -= nr + 1
+        self.counts[opponent] += nr
+        self.weights[player] -= weight + Bitboard.WEIGHTS[sq]
+        self.weights[opponent] += weight
+        if (1 << sq) & Bitboard.CORNERS:
+            self.corners[player] -= 1
+        if self.pattern_indices is not None:
+            update_indices(self.pattern_indices, player == Game.P_MAX, sq, flipped, undo=True)
+
+    def pass_turn(self):
+        return GameState(self.opponent(), boards=self.boards, zobrist_hash=self.hash ^ Zobrist.SIDE)
+
+    # square played to get from this state to new_state, None for a pass
+    def played_square(self, new_state):
+        occupied = self.boards[Game.P_MAX] | self.boards[Game.P_MIN]
+        added = (new_state.boards[Game.P_MAX] | new_state.boards[Game.P_MIN]) & ~occupied
+        if added == 0:
+            return None
+        return added.bit_length() - 1
+
+    def make_move(self, x, y):
+        if x < 0 or y < 0 or x >= Game.NR_ROW or y >= Game.NR_COL:
+            return False, self
+
+        sq = Bitboard.square(x, y)
+        if not self.legal_moves() >> sq & 1:
+            return False, self
+
+        return True, self.play(sq)
+
+    # calculates score for Game.P_MAX
+    def get_score(self):
+        return self.get_score_1()
+
+    # weighted discs, corners weigh 4, sides 2 and any other cell 1
+    def get_score_1(self):
+        p_max_score = self.weights[Game.P_MAX]
+        p_min_score = self.weights[Game.P_MIN]
+
+        return 100 * (p_max_score - p_min_score) / (p_max_score + p_min_score)
+
+    def get_score_2(self):
+        return 0.4 * self.get_parity_score() + 0.3 * self.get_corners_score() + 0.3 * self.get_mobility_score()
+
+    # predicted final disc difference, patterns is a PatternEvaluator
+    def get_score_3(self, patterns):
+        if self.pattern_indices is None:
+            self.track_patterns()
+        return patterns.evaluate(self.pattern_indices, self.counts[Game.P_MAX] + self.counts[Game.P_MIN])
+
+    # from now on apply_move and undo_move keep the pattern indices up to date, 8x8 boards only
+    def track_patterns(self):
+        if Game.NR_ROW != 8 or Game.NR_COL != 8:
+            raise Exception('pattern evaluation needs an 8x8 board')
+        self.pattern_indices = instance_indices(self.boards[Game.P_MAX], self.boards[Game.P_MIN])
+
+    # between -100 and 100
+    def get_parity_score(self):
+        p_max_occ = self.count_occurrence(Game.P_MAX)
+        p_min_occ = self.count_occurrence(Game.P_MIN)
+        return 100 * (p_max_occ - p_min_occ) / (p_max_occ + p_min_occ)
+
+    # between -100 and 100
+    def get_mobility_score(self):
+        p_max_mobility = self.count_moves(Game.P_MAX)
+        p_min_mobility = self.count_moves(Game.P_MIN)
+        if (p_max_mobility + p_min_mobility) > 0:
+            return 100 * (p_max_mobility - p_min_mobility) / (p_max_mobility + p_min_mobility)
+        else:
+            return 0
+
+    # between -100 and 100, corners not owned by Game.P_MAX count for Game.P_MIN
+    def get_corners_score(self):
+        p_max_corners_cnt = self.corners[Game.P_MAX]
+        p_min_corners_cnt = popcount(Bitboard.CORNERS) - p_max_corners_cnt
+
+        if (p_max_corners_cnt + p_min_corners_cnt) > 0:
+            return 100 * (p_max_corners_cnt - p_min_corners_cnt) / (p_max_corners_cnt + p_min_corners_cnt)
+        else:
+            return 0
+
+    def count_occurrence(self, ch):
+        if ch == Game.EMPTY:
+            return Game.NR_ROW * Game.NR_COL - self.counts[Game.P_MAX] - self.counts[Game.P_MIN]
+        return self.counts[ch]
+
+    def get_winner(self):
+        if self.is_final_state() is False:
+            return None
+
+        player_1_score = self.count_occurrence(Game.P_MAX)
+        player_2_score = self.count_occurrence(Game.P_MIN)
+
+        if player_1_score > player_2_score:
+            return Game.P_MAX
+        elif player_2_score > player_1_score:
+            return Game.P_MIN
+        elif player_1_score == player_2_score:
+            return "Tie"
+
+        return None
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class EndgameSolver:
+    FASTEST_FIRST_EMPTIES = 7  # above this many empty cells moves leaving the opponent fewest replies go first
+    LAST_EMPTIES = 4  # at or below this many empty cells the empty squares are tried directly
+    CHECK_STOP_EVERY = 1024  # nodes between two checks of stop_requested and the deadline
+
+    def __init__(self):
+        self.nodes = 0
+        self.stop_requested = False
+        self.deadline = None  # timer() value at which the search raises SearchTimeout, None for no limit
+
+    # exact final disc difference for Game.P_MAX with perfect play, and the best square to play
+    def solve(self, game_state):
+        own = game_state.boards[game_state.current_player]
+        opp = game_state.boards[game_state.opponent()]
+        moves = Bitboard.legal_moves(own, opp)
+        bound = Bitboard.SQUARES
+        if moves == 0:
+            score = self.search(own, opp, -bound, bound, False)
+            best_sq = None
+        else:
+            score = -bound - 1
+            best_sq = None
+            for sq in self.order(own, opp, moves):
+                flipped = Bitboard.flips(own, opp, sq)
+                new_score = -self.search(opp & ~flipped, own | flipped | (1 << sq), -bound, -score, False)
+                if new_score > score:
+                    score = new_score
+                    best_sq = sq
+
+        if game_state.current_player == Game.P_MIN:
+            score = -score
+        return score, best_sq
+
+    # parity first: squares in quadrants with an odd number of empty cells, then fastest first
+    def order(self, own, opp, moves):
+        empty = Bitboard.FULL & ~(own | opp)
+        odd = 0
+        for quadrant in Bitboard.QUADRANTS:
+            if popcount(empty & quadrant) & 1:
+                odd |= quadrant
+
+        squares = list(Bitboard.squares(moves))
+        if popcount(empty) > EndgameSolver.FASTEST_FIRST_EMPTIES:
+            def key(sq):
+                flipped = Bitboard.flips(own, opp, sq)
+                replies = Bitboard.legal_moves(opp & ~flipped, own | flipped | (1 << sq))
+                return popcount(replies), not odd >> sq & 1
+        else:
+            def key(sq):
+                return not odd >> sq & 1
+
+        squares.sort(key=key)
+        return squares
+
+    # negamax, the score is the final disc difference for the player owning own
+    def search(self, own, opp, alpha, beta, passed):
+        self.nodes += 1
+        if self.nodes % EndgameSolver.CHECK_STOP_EVERY == 0 and (
+                self.stop_requested or (self.deadline is not None and timer() > self.deadline)):
+            raise SearchTimeout()
+        empty = Bitboard.FULL & ~(own | opp)
+        if empty & (empty - 1) == 0:
+            if empty == 0:
+                return popcount(own) - popcount(opp)
+            return self.last_square(own, opp, empty.bit_length() - 1)
+
+        if popcount(empty) <= EndgameSolver.LAST_EMPTIES:
+            return self.search_last(own, opp, empty, alpha, beta, passed)
+
+        moves = Bitboard.legal_moves(own, opp)
+        if moves == 0:
+            if passed:
+                return popcount(own) - popcount(opp)
+            return -self.search(opp, own, -beta, -alpha, True)
+
+        score = -Bitboard.SQUARES - 1
+        for sq in self.order(own, opp, moves):
+            flipped = Bitboard.flips(own, opp, sq)
+            new_score = -self.search(opp & ~flipped, own | flipped | (1 << sq), -beta, -alpha, False)
+            if new_score > score:
+                score = new_score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        return score
+
+    # few empty cells left: probe them directly, odd quadrants first, instead of building the move mask
+    def search_last(self, own, opp, empty, alpha, beta, passed):
+        odd = 0
+        for quadrant in Bitboard.QUADRANTS:
+            if popcount(empty & quadrant) & 1:
+                odd |= quadrant
+        squares = list(Bitboard.squares(empty & odd)) + list(Bitboard.squares(empty & ~odd))
+
+        no_move = score = -Bitboard.SQUARES - 1
+        for sq in squares:
+            flipped = Bitboard.flips(own, opp, sq)
+            if flipped == 0:
+                continue
+            new_score = -self.search(opp & ~flipped, own | flipped | (1 << sq), -beta, -alpha, False)
+            if new_score > score:
+                score = new_score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if score == no_move:
+            if passed:
+                return popcount(own) - popcount(opp)
+            return -self.search(opp, own, -beta, -alpha, True)
+
+        return score
+
+    # the only empty cell is sq: whoever can play it does, own first
+    def last_square(self, own, opp, sq):
+        flipped = Bitboard.flips(own, opp, sq)
+        if flipped:
+            nr = popcount(flipped)
+            return popcount(own) - popcount(opp) + 2 * nr + 1
+
+        flipped = Bitboard.flips(opp, own, sq)
+        if flipped:
+            nr = popcount(flipped)
+            return popcount(own) - popcount(opp) - 2 * nr - 1
+
+        return popcount(own) - popcount(opp)
+
+
+class MCTSNode:
+    __slots__ = ('own', 'opp', 'player', 'sq', 'parent', 'children', 'untried', 'can_pass', 'visits', 'wins')
+
+    def __init__(self, own, opp, player, sq=None, parent=None):
+        self.own = own  # discs of player, who is to move
+        self.opp = opp
+        self.player = player
+        self.sq = sq  # square played from parent, None for a pass or the root
+        self.parent = parent
+        self.children = []
+        self.untried = Bitboard.legal_moves(own, opp)  # moves without a child yet
+
+        # the only child is a pass
+        self.can_pass = self.untried == 0 and Bitboard.legal_moves(opp, own) != 0
+
+        self.visits = 0
+        self.wins = 0.0  # playouts won by the player who moved here, draws count half
+
+    def is_terminal(self):
+        return self.untried == 0 and not self.can_pass and not self.children
+
+    def is_expanded(self):
+        return self.untried == 0 and not self.can_pass
+
+
+# UCT over a tree of MCTSNode kept between moves, leaves are scored by random playouts on bitboards
+class MonteCarloTreeSearch:
+    EXPLORATION = 1.4
+    CHECK_TIME_EVERY = 16  # playouts between two deadline checks, a batch counts as all its playouts
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.root = None
+        self.playouts = 0
+        self.stop_requested = False
+        self.np_rng = None
+
+    # root for game_state, a node of the previous tree when game_state was reached from its root
+    def set_root(self, game_state):
+        own = game_state.boards[game_state.current_player]
+        opp = game_state.boards[game_state.opponent()]
+
+        # the position after our move and the opponent's reply, with possible passes in between
+        nodes = [self.root] if self.root is not None else []
+        for _ in range(4):
+            for node in nodes:
+                if node.own == own and node.opp == opp and node.player == game_state.current_player:
+                    node.parent = None
+                    self.root = node
+                    return node
+            nodes = [child for node in nodes for child in node.children]
+
+        self.root = MCTSNode(own, opp, game_state.current_player)
+        return self.root
+
+    # runs iterations, or until deadline if it is not None, and returns the root
+    def search(self, game_state, iterations, deadline=None, batch=0):
+        root = self.set_root(game_state)
+        done = 0
+        unchecked = MonteCarloTreeSearch.CHECK_TIME_EVERY  # playouts since the last deadline check
+        batch_time = 0  # seconds taken by the last batch, the next one is not started unless it fits
+        while not self.stop_requested:
+            if deadline is None:
+                if done >= iterations:
+                    break
+            elif unchecked >= MonteCarloTreeSearch.CHECK_TIME_EVERY:
+                if timer() + batch_time >= deadline:
+                    break
+                unchecked = 0
+
+            node = self.select(root)
+            if not node.is_terminal():
+                node = self.expand(node)
+
+            if batch > 0:
+                batch_start = timer()
+                p_max_wins = self.batch_playout(node.own, node.opp, node.player, batch)
+                self.backpropagate(node, p_max_wins, batch)
+                batch_time = timer() - batch_start
+                unchecked += batch
+            else:
+                self.backpropagate(node, self.playout(node.own, node.opp, node.player), 1)
+                unchecked += 1
+            done += 1
+
+        return root
+
+    def select(self, node):
+        while node.is_expanded() and node.children:
+            log_visits = math.log(node.visits)
+            best_value = -1
+            for child in node.children:
+                value = child.wins / child.visits + MonteCarloTreeSearch.EXPLORATION * math.sqrt(log_visits / child.visits)
+                if value > best_value:
+                    best_value = value
+                    best = child
+            node = best
+
+        return node
+
+    def expand(self, node):
+        if node.untried == 0:
+            node.can_pass = False
+            child = MCTSNode(node.opp, node.own, Game.P_MAX + Game.P_MIN - node.player, None, node)
+        else:
+            sq = self.random_square(node.untried)
+            node.untried &= ~(1 << sq)
+            flipped = Bitboard.flips(node.own, node.opp, sq)
+            child = MCTSNode(node.opp & ~flipped, node.own | flipped | (1 << sq),
+                             Game.P_MAX + Game.P_MIN - node.player, sq, node)
+
+        node.children.append(child)
+        return child
+
+    # wins of Game.P_MAX out of playouts playouts, credited to every node up to the root
+    def backpropagate(self, node, p_max_wins, playouts):
+        self.playouts += playouts
+        while node is not None:
+            node.visits += playouts
+            if node.player == Game.P_MAX:
+                node.wins += playouts - p_max_wins
+            else:
+                node.wins += p_max_wins
+            node = node.parent
+
+    def random_square(self, moves):
+        for _ in range(self.rng.randrange(popcount(moves))):
+            moves &= moves - 1
+        return (moves & -moves).bit_length() - 1
+
+    # 1 if Game.P_MAX wins a random game from the position, 0.5 for a draw, 0 for a loss
+    def playout(self, own, opp, player):
+        passed = False
+        while True:
+            moves = Bitboard.legal_moves(own, opp)
+            if moves == 0:
+                if passed:
+                    break
+                passed = True
+            else:
+                passed = False
+                sq = self.random_square(moves)
+                flipped = Bitboard.flips(own, opp, sq)
+                own |= flipped | (1 << sq)
+                opp &= ~flipped
+            own, opp = opp, own
+            player = Game.P_MAX + Game.P_MIN - player
+
+        diff = popcount(own) - popcount(opp)
+        if player == Game.P_MIN:
+            diff = -diff
+        return 1.0 if diff > 0 else 0.5 if diff == 0 else 0.0
+
+    # playout random games from the same position at once on NumPy arrays of boards, returns the
+    # wins of Game.P_MAX
+    def batch_playout(self, own, opp, player, playouts):
+        if load_numpy() is None:
+            raise Exception('batched playouts need NumPy')
+        if Game.NR_ROW * Game.NR_COL > 64:
+            raise Exception('batched playouts need a board of at most 64 cells')
+        if self.np_rng is None:
+            self.np_rng = np.random.default_rng(self.rng.getrandbits(64))
+
+        one = np.uint64(1)
+        full = np.uint64(Bitboard.FULL)
+        left_shifts = [(np.uint64(shift), np.uint64(mask)) for shift, mask in Bitboard.LEFT_SHIFTS]
+        right_shifts = [(np.uint64(shift), np.uint64(mask)) for shift, mask in Bitboard.RIGHT_SHIFTS]
+        steps = max(Game.NR_ROW, Game.NR_COL) - 1
+
+        own = np.full(playouts, own, dtype=np.uint64)
+        opp = np.full(playouts, opp, dtype=np.uint64)
+        first = np.ones(playouts, dtype=bool)  # own belongs to player
+        passed = np.zeros(playouts, dtype=bool)
+        finished = np.zeros(playouts, dtype=bool)
+
+        while not finished.all():
+            moves = np.zeros(playouts, dtype=np.uint64)
+            for shifts, shift_fn in ((left_shifts, np.left_shift), (right_shifts, np.right_shift)):
+                for shift, mask in shifts:
+                    inner = opp & mask
+                    t = shift_fn(own, shift) & inner
+                    run = t
+                    for _ in range(steps - 1):
+                        t = shift_fn(t, shift) & inner
+                        run |= t
+                    moves |= shift_fn(run, shift) & mask
+            moves &= full & ~(own | opp)
+
+            no_moves = moves == 0
+            finished |= no_moves & passed
+            passed = no_moves
+
+            # the k-th lowest legal move with k random
+            k = (self.np_rng.random(playouts) * bitwise_count(moves)).astype(np.int64)
+            for _ in range(int(k.max(initial=0))):
+                moves = np.where(k > 0, moves & (moves - one), moves)
+                k -= 1
+            move = moves & (~moves + one)
+
+            flipped = np.zeros(playouts, dtype=np.uint64)
+            for shifts, shift_fn in ((left_shifts, np.left_shift), (right_shifts, np.right_shift)):
+                for shift, mask in shifts:
+                    t = shift_fn(move, shift) & mask
+                    line = np.zeros(playouts, dtype=np.uint64)
+                    bounded = np.zeros(playouts, dtype=np.uint64)
+                    for _ in range(steps):
+                        bounded |= t & own
+                        t &= opp
+                        line |= t
+                        t = shift_fn(t, shift) & mask
+                    flipped |= np.where(bounded != 0, line, 0)
+
+            playing = ~finished
+            own = np.where(playing, own | flipped | move, own)
+            opp = np.where(playing, opp & ~flipped, opp)
+            own, opp = np.where(playing, opp, own), np.where(playing, own, opp)
+            first = np.where(playing, ~first, first)
+
+        diff = bitwise_count(own).astype(np.int64) - bitwise_count(opp).astype(np.int64)
+        diff = np.where(first == (player == Game.P_MAX), diff, -diff)
+        return float((diff > 0).sum() + 0.5 * (diff == 0).sum())
+
+    # (square, visits, wins) of every root move
+    def root_moves(self):
+        return [(child.sq, child.visits, child.wins) for child in self.root.children]
+
+    # squares along the most visited children, None for a pass
+    def principal_variation(self):
+        pv = []
+        node = self.root
+        while node is not None and node.children:
+            node = max(node.children, key=lambda child: child.visits)
+            pv.append(node.sq)
+
+        return pv
+
+    def principal_depth(self):
+        return len(self.principal_variation())
+
+
+class TranspositionTable:
+    EXACT = 0
+    LOWER = 1  # score is a lower bound (search failed high)
+    UPPER = 2  # score is an upper bound (search failed low)
+
+    # entries are (hash, depth, bound, score, best square, generation) tuples
+    def __init__(self, entries=Game.TT_ENTRIES):
+        # every bucket holds a depth-preferred slot followed by an always-replace slot
+        self.buckets = max(1, entries // 2)
+        self.table = [None] * (2 * self.buckets)
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def clear(self):
+        self.table = [None] * (2 * self.buckets)
+        self.generation = 0
+
+    # called once per root search, entries from older searches lose their depth priority
+    def new_search(self):
+        self.generation += 1
+
+    def probe(self, h):
+        idx = 2 * (h % self.buckets)
+        entry = self.table[idx]
+        if entry is not None and entry[0] == h:
+            self.hits += 1
+            return entry
+
+        entry = self.table[idx + 1]
+        if entry is not None and entry[0] == h:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        return None
+
+    def store(self, h, depth, bound, score, sq):
+        idx = 2 * (h % self.buckets)
+        deep = self.table[idx]
+        if deep is None or deep[0] == h or depth >= deep[1] or deep[5] != self.generation:
+            if sq is None and deep is not None and deep[0] == h:
+                sq = deep[4]
+        else:
+            idx += 1
+            old = self.table[idx]
+            if sq is None and old is not None and old[0] == h:
+                sq = old[4]
+
+        old = self.table[idx]
+        if old is not None and old[0] != h:
+            self.overwrites += 1
+        self.stores += 1
+        self.table[idx] = (h, depth, bound, score, sq, self.generation)
+
+    def hit_rate(self):
+        if self.hits + self.misses == 0:
+            return 0
+        return self.hits / (self.hits + self.misses)
+
+
+# the same table in shared memory, used by an AI and all its search workers at once (see AI.lazy_smp); an
+# entry is three words: check, data and score bits, where check is the hash xored with the other two so
+# that an entry torn by two processes storing at once reads as a miss
+class SharedTranspositionTable(TranspositionTable):
+    DOUBLE = struct.Struct('<d')
+    WORD = struct.Struct('<Q')
+
+    # data word: depth, bound, square + 1 (0 for none), a bit set in every stored entry, generation
+    BOUND_SHIFT = 9
+    SQUARE_SHIFT = 11
+    USED = 1 << 20
+    GENERATION_SHIFT = 21
+
+    # words is the shared array of an existing table, a new one is allocated if it is None
+    def __init__(self, entries=Game.TT_ENTRIES, words=None):
+        self.buckets = max(1, entries // 2)
+        if words is None:
+            import multiprocessing
+            words = multiprocessing.RawArray('Q', 6 * self.buckets)
+        self.words = words
+        self.bytes = memoryview(words).cast('B')
+        self.table = self.bytes.cast('Q')
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def clear(self):
+        self.bytes[:] = bytes(len(self.bytes))
+        self.generation = 0
+
+    # the (hash, depth, bound, score, best square, generation) entry at word idx, None if it is empty
+    def read(self, idx):
+        check, data, bits = self.table[idx:idx + 3]
+        if data == 0:
+            return None
+        sq = (data >> SharedTranspositionTable.SQUARE_SHIFT & 0x1FF) - 1
+        return (check ^ data ^ bits, data & 0x1FF, data >> SharedTranspositionTable.BOUND_SHIFT & 3,
+                SharedTranspositionTable.DOUBLE.unpack(SharedTranspositionTable.WORD.pack(bits))[0],
+                None if sq < 0 else sq, data >> SharedTranspositionTable.GENERATION_SHIFT)
+
+    def probe(self, h):
+        idx = 6 * (h % self.buckets)
+        entry = self.read(idx)
+        if entry is not None and entry[0] == h:
+            self.hits += 1
+            return entry
+
+        entry = self.read(idx + 3)
+        if entry is not None and entry[0] == h:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        return None
+
+    def store(self, h, depth, bound, score, sq):
+        idx = 6 * (h % self.buckets)
+        deep = self.read(idx)
+        if deep is None or deep[0] == h or depth >= deep[1] or deep[5] != self.generation:
+            if sq is None and deep is not None and deep[0] == h:
+                sq = deep[4]
+        else:
+            idx += 3
+            old = self.read(idx)
+            if sq is None and old is not None and old[0] == h:
+                sq = old[4]
+
+        old = self.read(idx)
+        if old is not None and old[0] != h:
+            self.overwrites += 1
+        self.stores += 1
+        data = (depth | bound << SharedTranspositionTable.BOUND_SHIFT |
+                (0 if sq is None else sq + 1) << SharedTranspositionTable.SQUARE_SHIFT | SharedTranspositionTable.USED |
+                self.generation << SharedTranspositionTable.GENERATION_SHIFT)
+        bits = SharedTranspositionTable.WORD.unpack(SharedTranspositionTable.DOUBLE.pack(score))[0]
+        self.table[idx:idx + 3] = array('Q', (h ^ data ^ bits, data, bits))
+
+
+# figures about one AI.make_move call, see AI.stats
+class SearchStats:
+    def __init__(self):
+        self.method = None  # which search produced the move
+        self.depth = 0  # depth of the last completed search
+        self.nodes = 0
+        self.leaves = 0  # calls to the evaluation function
+        self.cutoffs = []  # beta cutoffs per ply
+        self.first_move_cutoffs = 0
+
+        # filled only when AI.timing is on, timing every node slows the search down
+        self.move_generation_time = 0
+        self.evaluation_time = 0
+        self.total_time = 0
+
+        self.tt_hits = 0
+        self.tt_misses = 0
+        self.tt_overwrites = 0
+
+    # adds the counters of a search run in a worker process, times are left out since they overlap
+    def add(self, other):
+        self.leaves += other.leaves
+        while len(self.cutoffs) < len(other.cutoffs):
+            self.cutoffs.append(0)
+        for ply, nr in enumerate(other.cutoffs):
+            self.cutoffs[ply] += nr
+        self.first_move_cutoffs += other.first_move_cutoffs
+        self.tt_hits += other.tt_hits
+        self.tt_misses += other.tt_misses
+        self.tt_overwrites += other.tt_overwrites
+
+    def add_cutoff(self, ply, first_move):
+        while len(self.cutoffs) <= ply:
+            self.cutoffs.append(0)
+        self.cutoffs[ply] += 1
+        if first_move:
+            self.first_move_cutoffs += 1
+
+    def first_move_cutoff_rate(self):
+        if sum(self.cutoffs) == 0:
+            return 0
+        return self.first_move_cutoffs / sum(self.cutoffs)
+
+    # b such that b + b^2 + ... + b^depth = nodes
+    def branching_factor(self):
+        if self.depth == 0 or self.nodes <= self.depth:
+            return 0
+
+        low = 1
+        high = self.nodes
+        for _ in range(100):
+            b = (low + high) / 2
+            if sum(b ** k for k in range(1, self.depth + 1)) < self.nodes:
+                low = b
+            else:
+                high = b
+
+        return (low + high) / 2
+
+    def nodes_per_second(self):
+        if self.total_time == 0:
+            return 0
+        return self.nodes / self.total_time
+
+    def tt_hit_rate(self):
+        if self.tt_hits + self.tt_misses == 0:
+            return 0
+        return self.tt_hits / (self.tt_hits + self.tt_misses)
+
+    def report(self):
+        lines = [
+            "Search: {} to depth {}, {} nodes in {:.3f} seconds ({:.0f} nodes/sec).".format(
+                self.method, self.depth, self.nodes, self.total_time, self.nodes_per_second()),
+            "Leaf evaluations: {}, effective branching factor {:.2f}.".format(self.leaves, self.branching_factor()),
+            "Cutoffs by ply: {}, {:.1%} on the first move.".format(
+                ' '.join('{}:{}'.format(ply, nr) for ply, nr in enumerate(self.cutoffs)) or 'none',
+                self.first_move_cutoff_rate()),
+        ]
+        if self.move_generation_time or self.evaluation_time:
+            search_time = self.total_time - self.move_generation_time - self.evaluation_time
+            lines.append("Time: move generation {:.3f}s, evaluation {:.3f}s, search {:.3f}s.".format(
+                self.move_generation_time, self.evaluation_time, search_time))
+        if self.tt_hits + self.tt_misses:
+            lines.append("Transposition table: {} probes, {:.1%} hits, {} overwrites.".format(
+                self.tt_hits + self.tt_misses, self.tt_hit_rate(), self.tt_overwrites))
+
+        return '\n'.join(lines)
+
+
+# samples the stack of one thread at a fixed interval, a lighter alternative to cProfile
+class SamplingProfiler:
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.samples = {}  # (file, first line, function) -> times seen on top of the stack
+        self.thread = None
+        self.target = None
+        self.running = False
+
+    def start(self):
+        self.target = threading.get_ident()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while self.running:
+            frame = sys._current_frames().get(self.target)
+            if frame is not None:
+                code = frame.f_code
+                key = (code.co_filename, code.co_firstlineno, code.co_name)
+                self.samples[key] = self.samples.get(key, 0) + 1
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+
+    def report(self, limit=20):
+        total = sum(self.samples.values()) or 1
+        lines = ["{} samples".format(total)]
+        for (filename, line, function), count in sorted(self.samples.items(), key=lambda item: -item[1])[:limit]:
+            lines.append("{:6.1%}  {} ({}:{})".format(count / total, function, filename, line))
+
+        return '\n'.join(lines)
+
+
+class AI:
+    CHECK_TIME_EVERY = 256  # nodes between two deadline checks
+    STOP_POLL = 0.005  # seconds between two looks of a Lazy SMP helper at the stop flag
+    KILLERS_PER_PLY = 2
+    NULL_WINDOW = 0.01  # width of a null window, scores are not integers
+    ASPIRATION_WINDOW = 10  # the first aspiration window spans this much on both sides of the previous score
+
+    # SearchStats.method of every Game.ALGORITHM
+    METHODS = ['mini_max', 'alpha_beta', 'mcts', 'pvs', 'aspiration', 'mtdf']
+
+    def __init__(self, tt_entries=None):
+        self.table = TranspositionTable(Game.TT_ENTRIES if tt_entries is None else tt_entries)
+        self.solver = EndgameSolver()
+        self.mcts = MonteCarloTreeSearch()
+        self.evaluation = Game.EVALUATION
+        self.patterns = None
+        self.table_evaluation = None  # (evaluation, patterns path) of the scores in the table
+        self.table_owner = True  # False in a worker, whose shared table the parent's AI clears
+        self.book = None
+        self.pool = None
+        self.pool_key = None  # (workers, table size, rows, columns) the pool was started for
+        self.pool_stop = None  # set to stop the Lazy SMP helpers
+        self.shared_table = None  # the table this AI and its workers share during a Lazy SMP search
+        self.nodes = 0
+        self.deadline = None
+        self.stop_requested = False
+        self.completed_depth = 0
+
+        # hash -> square along the principal variation of the last completed iteration
+        self.pv = {}
+
+        # per ply, the latest squares that caused a cutoff
+        self.killers = []
+
+        # player -> per square, sum of depth * depth over the cutoffs it caused
+        self.history_scores = {
+            Game.P_MAX: [0] * (Game.NR_ROW * Game.NR_COL),
+            Game.P_MIN: [0] * (Game.NR_ROW * Game.NR_COL),
+        }
+
+        # statistics of the last make_move call
+        self.stats = SearchStats()
+        self.timing = False
+
+        # 'cprofile' or 'sample' profiles the next make_move call, the report goes to profile_output
+        self.profile_next = None
+        self.profile_output = None
+
+    # fallback ordering: corners, edges, inner cells, C squares, X squares
+    @staticmethod
+    def static_value(sq):
+        bit = 1 << sq
+        if bit & Bitboard.CORNERS:
+            return 4
+        if bit & Bitboard.X_SQUARES:
+            return 0
+        if bit & Bitboard.C_SQUARES:
+            return 1
+        if bit & Bitboard.EDGES:
+            return 3
+        return 2
+
+    # makes a search running on another thread raise SearchTimeout
+    def request_stop(self, stop=True):
+        self.stop_requested = stop
+        self.solver.stop_requested = stop
+        self.mcts.stop_requested = stop
+
+    def evaluate(self, game_state):
+        self.stats.leaves += 1
+        if self.timing:
+            start = timer()
+            if self.evaluation == 3:
+                score = game_state.get_score_3(self.patterns)
+            else:
+                score = game_state.get_score_2() if self.evaluation == 2 else game_state.get_score_1()
+            self.stats.evaluation_time += timer() - start
+            return score
+
+        if self.evaluation == 3:
+            return game_state.get_score_3(self.patterns)
+        if self.evaluation == 2:
+            return game_state.get_score_2()
+        return game_state.get_score_1()
+
+    # evaluation and pattern weights of config; table entries are keyed by position only, so the
+    # tables are cleared when the evaluation changes
+    def set_evaluation(self, config):
+        key = (config.evaluation, config.patterns_path if config.evaluation == 3 else None)
+        if key != self.table_evaluation:
+            self.table_evaluation = key
+            if self.table_owner:
+                self.table.clear()
+                if self.shared_table is not None:
+                    self.shared_table.clear()
+            self.pv = {}
+            self.killers = []
+
+        self.evaluation = config.evaluation
+        if config.evaluation == 3 and (self.patterns is None or self.patterns.path != config.patterns_path):
+            self.patterns = PatternEvaluator(config.patterns_path)
+
+    # order_moves squares, or plain iter_moves (square, flipped discs) pairs, timed as move generation
+    def timed_moves(self, game_state, tt_sq=None, ordered=True):
+        start = timer()
+        moves = self.order_moves(game_state, tt_sq) if ordered else list(game_state.iter_moves())
+        self.stats.move_generation_time += timer() - start
+        return moves
+
+    def new_search(self):
+        self.table.new_search()
+        self.pv = {}
+        self.killers = []
+        for scores in self.history_scores.values():
+            for sq in range(len(scores)):
+                scores[sq] >>= 1
+
+    def first_move_cutoff_rate(self):
+        return self.stats.first_move_cutoff_rate()
+
+    def record_cutoff(self, game_state, depth, idx, sq):
+        ply = len(game_state.history)
+        self.stats.add_cutoff(ply, idx == 0)
+
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if sq not in killers:
+            killers.insert(0, sq)
+            del killers[AI.KILLERS_PER_PLY:]
+
+        self.history_scores[game_state.current_player][sq] += depth * depth
+
+    # searches in place on a copy of game_state, returns (score, chosen child state)
+    def mini_max(self, game_state, depth):
+        score, sq = self.mini_max_search(game_state.copy(), depth)
+        if sq is None:
+            return score, game_state
+
+        return score, game_state.play(sq)
+
+    def alpha_beta(self, game_state, depth, alpha, beta):
+        self.new_search()
+        score, sq = self.alpha_beta_search(game_state.copy(), depth, alpha, beta)
+        if sq is None:
+            return score, game_state
+
+        return score, game_state.play(sq)
+
+    def pvs(self, game_state, depth):
+        self.new_search()
+        score, sq = self.pvs_search(game_state.copy(), depth, Game.MIN_SCORE, Game.MAX_SCORE)
+        if sq is None:
+            return score, game_state
+
+        return score, game_state.play(sq)
+
+    def mini_max_search(self, game_state, depth):
+        self.nodes += 1
+        if self.stop_requested and self.nodes % AI.CHECK_TIME_EVERY == 0:
+            raise SearchTimeout()
+        if depth == 0 or game_state.is_final_state() is True:
+            return self.evaluate(game_state), None
+
+        if not game_state.can_advance():  # passing does not use up depth
+            game_state.apply_pass()
+            score, _ = self.mini_max_search(game_state, depth)
+            game_state.undo_move()
+            return score, None
+
+        best_sq = None
+        if game_state.current_player == Game.P_MAX:  # we maximize score
+            score = Game.MIN_SCORE
+            moves = self.timed_moves(game_state, ordered=False) if self.timing else game_state.iter_moves()
+            for sq, flipped in moves:
+                game_state.apply_move(sq, flipped)
+                new_score, _ = self.mini_max_search(game_state, depth - 1)
+                game_state.undo_move()
+                if new_score > score:
+                    score = new_score
+                    best_sq = sq
+        else:  # we minimize score
+            score = Game.MAX_SCORE
+            moves = self.timed_moves(game_state, ordered=False) if self.timing else game_state.iter_moves()
+            for sq, flipped in moves:
+                game_state.apply_move(sq, flipped)
+                new_score, _ = self.mini_max_search(game_state, depth - 1)
+                game_state.undo_move()
+                if new_score < score:
+                    score = new_score
+                    best_sq = sq
+
+        return score, best_sq
+
+    def alpha_beta_search(self, game_state, depth, alpha, beta):
+        self.nodes += 1
+        if self.nodes % AI.CHECK_TIME_EVERY == 0 and (
+                self.stop_requested or (self.deadline is not None and timer() > self.deadline)):
+            raise SearchTimeout()
+
+        if depth == 0 or game_state.is_final_state():
+            return self.evaluate(game_state), None
+
+        if not game_state.can_advance():  # passing does not use up depth
+            game_state.apply_pass()
+            score, _ = self.alpha_beta_search(game_state, depth, alpha, beta)
+            game_state.undo_move()
+            return score, None
+
+        alpha_orig = alpha
+        beta_orig = beta
+        tt_sq = None
+        entry = self.table.probe(game_state.hash)
+        if entry is not None:
+            tt_sq = entry[4]
+            if entry[1] >= depth:
+                if entry[2] == TranspositionTable.EXACT:
+                    return entry[3], tt_sq
+                elif entry[2] == TranspositionTable.LOWER:
+                    alpha = max(alpha, entry[3])
+                else:
+                    beta = min(beta, entry[3])
+                if alpha >= beta:
+                    return entry[3], tt_sq
+
+        moves = self.timed_moves(game_state, tt_sq) if self.timing else self.order_moves(game_state, tt_sq)
+
+        best_sq = None
+        if game_state.current_player == Game.P_MAX:  # we maximize score
+            score = Game.MIN_SCORE
+            for idx, sq in enumerate(moves):
+                game_state.apply_move(sq)
+                new_score, _ = self.alpha_beta_search(game_state, depth - 1, alpha, beta)
+                game_state.undo_move()
+                if new_score > score:
+                    score = new_score
+                    best_sq = sq
+                alpha = max(alpha, new_score)
+                if alpha >= beta:
+                    self.record_cutoff(game_state, depth, idx, sq)
+                    break
+        else:  # we minimize score
+            score = Game.MAX_SCORE
+            for idx, sq in enumerate(moves):
+                game_state.apply_move(sq)
+                new_score, _ = self.alpha_beta_search(game_state, depth - 1, alpha, beta)
+                game_state.undo_move()
+                if new_score < score:
+                    score = new_score
+                    best_sq = sq
+                beta = min(beta, new_score)
+                if alpha >= beta:
+                    self.record_cutoff(game_state, depth, idx, sq)
+                    break
+
+        if score <= alpha_orig:
+            bound = TranspositionTable.UPPER
+        elif score >= beta_orig:
+            bound = TranspositionTable.LOWER
+        else:
+            bound = TranspositionTable.EXACT
+        self.table.store(game_state.hash, depth, bound, score, best_sq)
+
+        return score, best_sq
+
+    # principal variation search: alpha-beta where every move after the first is searched with a null
+    # window that only proves it no better, a move that turns out better is searched again in full
+    def pvs_search(self, game_state, depth, alpha, beta):
+        self.nodes += 1
+        if self.nodes % AI.CHECK_TIME_EVERY == 0 and (
+                self.stop_requested or (self.deadline is not None and timer() > self.deadline)):
+            raise SearchTimeout()
+
+        if depth == 0 or game_state.is_final_state():
+            return self.evaluate(game_state), None
+
+        if not game_state.can_advance():  # passing does not use up depth
+            game_state.apply_pass()
+            score, _ = self.pvs_search(game_state, depth, alpha, beta)
+            game_state.undo_move()
+            return score, None
+
+        alpha_orig = alpha
+        beta_orig = beta
+        tt_sq = None
+        entry = self.table.probe(game_state.hash)
+        if entry is not None:
+            tt_sq = entry[4]
+            if entry[1] >= depth:
+                if entry[2] == TranspositionTable.EXACT:
+                    return entry[3], tt_sq
+                elif entry[2] == TranspositionTable.LOWER:
+                    alpha = max(alpha, entry[3])
+                else:
+                    beta = min(beta, entry[3])
+                if alpha >= beta:
+                    return entry[3], tt_sq
+
+        moves = self.timed_moves(game_state, tt_sq) if self.timing else self.order_moves(game_state, tt_sq)
+
+        best_sq = None
+        if game_state.current_player == Game.P_MAX:  # we maximize score
+            score = Game.MIN_SCORE
+            for idx, sq in enumerate(moves):
+                game_state.apply_move(sq)
+                if idx == 0 or beta - alpha <= AI.NULL_WINDOW:
+                    new_score, _ = self.pvs_search(game_state, depth - 1, alpha, beta)
+                else:
+                    new_score, _ = self.pvs_search(game_state, depth - 1, alpha, alpha + AI.NULL_WINDOW)
+                    if alpha + AI.NULL_WINDOW <= new_score < beta:
+                        new_score, _ = self.pvs_search(game_state, depth - 1, alpha, beta)
+                game_state.undo_move()
+                if new_score > score:
+                    score = new_score
+                    best_sq = sq
+                alpha = max(alpha, new_score)
+                if alpha >= beta:
+                    self.record_cutoff(game_state, depth, idx, sq)
+                    break
+        else:  # we minimize score
+            score = Game.MAX_SCORE
+            for idx, sq in enumerate(moves):
+                game_state.apply_move(sq)
+                if idx == 0 or beta - alpha <= AI.NULL_WINDOW:
+                    new_score, _ = self.pvs_search(game_state, depth - 1, alpha, beta)
+                else:
+                    new_score, _ = self.pvs_search(game_state, depth - 1, beta - AI.NULL_WINDOW, beta)
+                    if alpha < new_score <= beta - AI.NULL_WINDOW:
+                        new_score, _ = self.pvs_search(game_state, depth - 1, alpha, beta)
+                game_state.undo_move()
+                if new_score < score:
+                    score = new_score
+                    best_sq = sq
+                beta = min(beta, new_score)
+                if alpha >= beta:
+                    self.record_cutoff(game_state, depth, idx, sq)
+                    break
+
+        if score <= alpha_orig:
+            bound = TranspositionTable.UPPER
+        elif score >= beta_orig:
+            bound = TranspositionTable.LOWER
+        else:
+            bound = TranspositionTable.EXACT
+        self.table.store(game_state.hash, depth, bound, score, best_sq)
+
+        return score, best_sq
+
+    # alpha-beta in a window around guess, the side the score falls out of is widened until it fits
+    def aspiration_search(self, game_state, depth, guess):
+        if guess is None:
+            return self.alpha_beta_search(game_state, depth, Game.MIN_SCORE, Game.MAX_SCORE)
+
+        delta = AI.ASPIRATION_WINDOW
+        alpha = max(Game.MIN_SCORE, guess - delta)
+        beta = min(Game.MAX_SCORE, guess + delta)
+        while True:
+            score, sq = self.alpha_beta_search(game_state, depth, alpha, beta)
+            if score <= alpha and alpha > Game.MIN_SCORE:
+                delta *= 2
+                alpha = max(Game.MIN_SCORE, score - delta)
+            elif score >= beta and beta < Game.MAX_SCORE:
+                delta *= 2
+                beta = min(Game.MAX_SCORE, score + delta)
+            else:
+                return score, sq
+
+    # MTD(f): null window searches, each proving a bound on the score, move towards the score until the
+    # bounds meet; the transposition table keeps what the earlier searches found
+    def mtdf_search(self, game_state, depth, guess):
+        maximize = game_state.current_player == Game.P_MAX
+        score = 0 if guess is None else guess
+        lower = Game.MIN_SCORE
+        upper = Game.MAX_SCORE
+        best_sq = None
+
+        while upper - lower >= AI.NULL_WINDOW:
+            beta = max(score, lower + AI.NULL_WINDOW)
+            score, sq = self.alpha_beta_search(game_state, depth, beta - AI.NULL_WINDOW, beta)
+            exact = beta - AI.NULL_WINDOW < score < beta
+            if score < beta:
+                upper = score
+            else:
+                lower = score
+
+            # only a bound in favor of the player to move proves that its move is the best
+            if sq is not None and (best_sq is None or exact or (score >= beta) == maximize):
+                best_sq = sq
+            if exact:
+                break
+
+        return score, best_sq
+
+    # legal squares of game_state: principal variation move, transposition move, killers, then by history
+    # score and static square value; flips are left to apply_move since after a cutoff most moves are
+    # never played, which saves the more the more moves there are, as on large boards
+    def order_moves(self, game_state, tt_sq):
+        moves = list(Bitboard.squares(game_state.legal_moves()))
+        if len(moves) < 2:
+            return moves
+
+        pv_sq = self.pv.get(game_state.hash)
+        ply = len(game_state.history)
+        killers = self.killers[ply] if ply < len(self.killers) else []
+        history_scores = self.history_scores[game_state.current_player]
+
+        def key(sq):
+            if sq == pv_sq:
+                return 3, 0, 0
+            if sq == tt_sq:
+                return 2, 0, 0
+            if sq in killers:
+                return 1, -killers.index(sq), 0
+            return 0, history_scores[sq], AI.static_value(sq)
+
+        moves.sort(key=key, reverse=True)
+        return moves
+
+    # follows best moves stored in the transposition table from game_state
+    def principal_variation(self, game_state, depth):
+        state = game_state.copy()
+        pv = []
+        while len(pv) < depth:
+            entry = self.table.probe(state.hash)
+            if entry is None or entry[4] is None or not state.legal_moves() >> entry[4] & 1:
+                break
+            pv.append((state.hash, entry[4]))
+            state.apply_move(entry[4])
+
+        return pv
+
+    # one iteration of iterative_deepening with the search of algorithm, guess is the score of the
+    # previous iteration
+    def deepening_search(self, game_state, depth, algorithm, guess):
+        if algorithm == 3:
+            return self.pvs_search(game_state, depth, Game.MIN_SCORE, Game.MAX_SCORE)
+        if algorithm == 4:
+            return self.aspiration_search(game_state, depth, guess)
+        if algorithm == 5:
+            return self.mtdf_search(game_state, depth, guess)
+        return self.alpha_beta_search(game_state, depth, Game.MIN_SCORE, Game.MAX_SCORE)
+
+    # searches to increasing depths until move_time_ms runs out, or up to max_depth without a time
+    # limit, the last completed depth decides
+    def iterative_deepening(self, game_state, move_time_ms, algorithm=1, max_depth=None):
+        self.new_search()
+        state = game_state.copy()
+        empties = game_state.count_occurrence(Game.EMPTY)
+        start_time = timer()
+
+        # depth 1 always completes so that there is a move to return
+        score, best_sq = self.deepening_search(state, 1, algorithm, None)
+        self.completed_depth = 1
+
+        if move_time_ms > 0:
+            self.deadline = start_time + move_time_ms / 1000
+        try:
+            for depth in range(2, (empties if max_depth is None else max_depth) + 1):
+                score, best_sq = self.deepening_search(state, depth, algorithm, score)
+                self.completed_depth = depth
+                self.pv = dict(self.principal_variation(game_state, depth))
+        except SearchTimeout:
+            pass  # state is a throwaway copy, the interrupted iteration is simply dropped
+        finally:
+            self.deadline = None
+
+        if best_sq is None:
+            return score, game_state
+
+        return score, game_state.play(best_sq)
+
+    # worker processes for the parallel searches; the board size is handed to them since only forked
+    # workers inherit it
+    def get_pool(self, config):
+        key = (config.workers, config.tt_entries, Game.NR_ROW, Game.NR_COL)
+        if self.pool is None or self.pool_key != key:
+            from concurrent.futures import ProcessPoolExecutor
+            import multiprocessing
+
+            self.close()
+            self.pool_stop = multiprocessing.Value('b', 0, lock=False)
+            self.shared_table = SharedTranspositionTable(config.tt_entries)
+            self.pool = ProcessPoolExecutor(max_workers=config.workers - 1, initializer=init_search_worker,
+                                            initargs=(config.tt_entries, self.shared_table.words, self.pool_stop,
+                                                      Game.NR_ROW, Game.NR_COL))
+            self.pool_key = key
+
+        return self.pool
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+            self.pool_key = None
+            self.shared_table = None
+
+    # mini-max has no bounds to share, so the root moves are simply split: the first is searched here,
+    # the others in the pool
+    def parallel_search(self, game_state, config):
+        moves = self.order_moves(game_state, None)
+        if len(moves) < 2 or config.level < 2:
+            return self.serial_search(game_state, config)
+
+        pool = self.get_pool(config)
+        maximize = game_state.current_player == Game.P_MAX
+        futures = [pool.submit(search_root_move, game_state.boards, game_state.current_player, sq, config)
+                   for sq in moves[1:]]
+
+        state = game_state.copy()
+        best_sq = moves[0]
+        state.apply_move(best_sq)
+        best_score, _ = self.mini_max_search(state, config.level - 1)
+
+        for future in futures:
+            sq, score, stats = future.result()
+            self.nodes += stats.nodes
+            self.stats.add(stats)
+            if (maximize and score > best_score) or (not maximize and score < best_score):
+                best_score = score
+                best_sq = sq
+
+        return best_score, game_state.play(best_sq)
+
+    # Lazy SMP: config.workers - 1 helpers search the same position with iterative deepening, every
+    # other one a ply deeper, while this process deepens as it would alone; all share one transposition
+    # table, so what one finds cuts the others' searches short. The helpers stop once this process is
+    # done, to config.level or when config.move_time_ms runs out
+    def lazy_smp(self, game_state, config):
+        pool = self.get_pool(config)
+        table = self.shared_table
+        start_hits = table.hits
+        start_misses = table.misses
+        start_overwrites = table.overwrites
+
+        # the helpers store entries of the generation iterative_deepening is about to start
+        self.pool_stop.value = 0
+        futures = [pool.submit(helper_search, game_state.boards, game_state.current_player, config,
+                               table.generation + 1, helper)
+                   for helper in range(1, config.workers)]
+
+        serial_table = self.table
+        self.table = table
+        try:
+            max_depth = None if config.move_time_ms > 0 else config.level
+            return self.iterative_deepening(game_state, config.move_time_ms, config.algorithm, max_depth)
+        finally:
+            self.table = serial_table
+            self.pool_stop.value = 1
+            for future in futures:
+                stats = future.result()
+                self.nodes += stats.nodes
+                self.stats.add(stats)
+            self.stats.tt_hits += table.hits - start_hits
+            self.stats.tt_misses += table.misses - start_misses
+            self.stats.tt_overwrites += table.overwrites - start_overwrites
+
+    def serial_search(self, game_state, config):
+        if config.algorithm == 0:
+            return self.mini_max(game_state, config.level)
+        elif config.algorithm == 1:
+            if config.move_time_ms > 0:
+                return self.iterative_deepening(game_state, config.move_time_ms)
+            return self.alpha_beta(game_state, config.level, Game.MIN_SCORE, Game.MAX_SCORE)
+        elif config.algorithm == 2:
+            self.run_mcts(game_state, config, config.mcts_iterations)
+            return self.mcts_move(game_state, self.mcts.root_moves())
+        elif config.algorithm == 3:
+            if config.move_time_ms > 0:
+                return self.iterative_deepening(game_state, config.move_time_ms, 3)
+            return self.pvs(game_state, config.level)
+        elif config.algorithm in (4, 5):
+            # both need the score of the previous depth, fixed depth searches deepen too
+            if config.move_time_ms > 0:
+                return self.iterative_deepening(game_state, config.move_time_ms, config.algorithm)
+            return self.iterative_deepening(game_state, 0, config.algorithm, config.level)
+        else:
+            raise Exception('unknown algorithm')
+
+    # grows the tree for config.move_time_ms, or iterations playouts without a time budget
+    def run_mcts(self, game_state, config, iterations):
+        deadline = None
+        if config.move_time_ms > 0:
+            deadline = timer() + config.move_time_ms / 1000
+
+        start_playouts = self.mcts.playouts
+        self.mcts.search(game_state, iterations, deadline, config.mcts_batch)
+        self.nodes += self.mcts.playouts - start_playouts
+        self.stats.depth = self.mcts.principal_depth()
+
+    # the most visited of the (square, visits, wins) root moves, scored by its win rate
+    @staticmethod
+    def mcts_move(game_state, moves):
+        if not moves:
+            return 0, game_state
+
+        sq, visits, wins = max(moves, key=lambda move: move[1])
+        rate = wins / visits
+        if game_state.current_player == Game.P_MIN:
+            rate = 1 - rate
+        score = 100 * (2 * rate - 1)
+        if sq is None:
+            return score, game_state.pass_turn()
+
+        return score, game_state.play(sq)
+
+    # root parallel: every process grows its own tree from game_state and the root moves' visits and
+    # wins are added up
+    def parallel_mcts(self, game_state, config):
+        pool = self.get_pool(config)
+        iterations = max(1, config.mcts_iterations // config.workers)
+        futures = [pool.submit(mcts_root_search, game_state.boards, game_state.current_player, config, iterations,
+                               self.mcts.rng.getrandbits(64))
+                   for _ in range(config.workers - 1)]
+
+        self.run_mcts(game_state, config, iterations)
+        totals = {}
+        for sq, visits, wins in self.mcts.root_moves():
+            totals[sq] = [visits, wins]
+        for future in futures:
+            moves, stats = future.result()
+            self.nodes += stats.nodes
+            self.stats.add(stats)
+            for sq, visits, wins in moves:
+                total = totals.setdefault(sq, [0, 0.0])
+                total[0] += visits
+                total[1] += wins
+
+        return self.mcts_move(game_state, [(sq, visits, wins) for sq, (visits, wins) in totals.items()])
+
+    def get_book(self, path):
+        if self.book is None or self.book.path != path:
+            if self.book is not None:
+                self.book.close()
+            self.book = OpeningBook(path)
+
+        return self.book
+
+    # (score, new state) if the book knows game_state or one of its rotations and reflections, otherwise None
+    def book_move(self, game_state, path):
+        key, symmetry = game_state.canonical_hash()
+        entry = self.get_book(path).lookup(key)
+        if entry is None:
+            return None
+
+        sq = Bitboard.INVERSE_SQUARES[symmetry][entry[0]]
+        if not game_state.legal_moves() >> sq & 1:
+            return None
+
+        return entry[1], game_state.play(sq)
+
+    # exact disc difference instead of a heuristic score once the end is in reach
+    def endgame_search(self, game_state):
+        self.solver.nodes = 0
+        try:
+            score, sq = self.solver.solve(game_state)
+        finally:
+            self.nodes += self.solver.nodes
+        if sq is None:
+            return score, game_state
+
+        return score, game_state.play(sq)
+
+    # config defaults to the current Game settings, fills self.stats; profile is False for searches that
+    # leave profile_next to the next move, like the ones of the ponder thread
+    def make_move(self, game_state, config=None, profile=True):
+        if config is None:
+            config = SearchConfig()
+
+        self.stats = SearchStats()
+        start_nodes = self.nodes
+        start_hits = self.table.hits
+        start_misses = self.table.misses
+        start_overwrites = self.table.overwrites
+        start_time = timer()
+
+        if self.profile_next is None or not profile:
+            result = self.search(game_state, config)
+        else:
+            result = self.profile(game_state, config)
+
+        self.stats.total_time = timer() - start_time
+        self.stats.nodes = self.nodes - start_nodes
+        self.stats.tt_hits += self.table.hits - start_hits
+        self.stats.tt_misses += self.table.misses - start_misses
+        self.stats.tt_overwrites += self.table.overwrites - start_overwrites
+
+        return result
+
+    def profile(self, game_state, config):
+        mode = self.profile_next
+        self.profile_next = None
+
+        if mode == 'cprofile':
+            import cProfile
+            import pstats
+
+            profiler = cProfile.Profile()
+            result = profiler.runcall(self.search, game_state, config)
+            if self.profile_output is None:
+                pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+            else:
+                profiler.dump_stats(self.profile_output)
+        elif mode == 'sample':
+            profiler = SamplingProfiler()
+            profiler.start()
+            try:
+                result = self.search(game_state, config)
+            finally:
+                profiler.stop()
+            if self.profile_output is None:
+                print(profiler.report())
+            else:
+                with open(self.profile_output, 'w') as f:
+                    f.write(profiler.report() + '\n')
+        else:
+            raise Exception('unknown profiler {}'.format(mode))
+
+        return result
+
+    def search(self, game_state, config):
+        self.set_evaluation(config)
+
+        if config.book_path is not None:
+            result = self.book_move(game_state, config.book_path)
+            if result is not None:
+                self.stats.method = 'book'
+                return result
+
+        empties = game_state.count_occurrence(Game.EMPTY)
+        if empties <= config.endgame_empties:
+            self.stats.method = 'endgame'
+            self.stats.depth = empties
+            if config.move_time_ms == 0:
+                return self.endgame_search(game_state)
+
+            # with a move time the solver gets half of it, the usual search below the rest if it does not finish
+            start_time = timer()
+            self.solver.deadline = start_time + config.move_time_ms / 2000
+            try:
+                return self.endgame_search(game_state)
+            except SearchTimeout:
+                config = copy.copy(config)
+                config.move_time_ms = max(1, config.move_time_ms - round((timer() - start_time) * 1000))
+            finally:
+                self.solver.deadline = None
+
+        self.stats.method = AI.METHODS[config.algorithm] if 0 <= config.algorithm < len(AI.METHODS) else None
+        self.stats.depth = config.level
+        if config.workers > 1 and config.algorithm == 0:
+            self.stats.method = 'parallel mini_max'
+            return self.parallel_search(game_state, config)
+        if config.workers > 1 and config.algorithm == 2:
+            self.stats.method = 'parallel mcts'
+            return self.parallel_mcts(game_state, config)
+        if config.workers > 1 and config.algorithm in (1, 3, 4, 5):
+            self.stats.method = 'lazy smp ' + self.stats.method
+            result = self.lazy_smp(game_state, config)
+            self.stats.depth = self.completed_depth
+            return result
+
+        result = self.serial_search(game_state, config)
+        if config.algorithm in (1, 3, 4, 5) and config.move_time_ms > 0:
+            self.stats.depth = self.completed_depth
+        return result
+
+
+# searches the positions after each of the human's moves on a background thread, the predicted
+# reply first, so that the AI can answer from the results once the human has moved
+class Ponderer:
+    def __init__(self, ai):
+        self.ai = ai
+        self.thread = None
+
+        # canonical key -> (position, its symmetry, search result, search statistics) for every finished
+        # search, a position symmetric to one already searched is not searched again
+        self.results = {}
+
+    def start(self, game_state, config):
+        self.stop()
+        self.results = {}
+
+        # the background search stays in this process, searches there cannot be interrupted
+        config = copy.copy(config)
+        config.workers = 1
+
+        self.thread = threading.Thread(target=self.run, args=(game_state.copy(), config), daemon=True)
+        self.thread.start()
+
+    def run(self, game_state, config):
+        for sq in self.ai.order_moves(game_state, None):
+            new_state = game_state.play(sq)
+            if not new_state.can_advance():
+                continue
+            key, symmetry = new_state.canonical()
+            if key in self.results:
+                continue
+
+            try:
+                result = self.ai.make_move(new_state, config, profile=False)
+            except SearchTimeout:
+                return
+            if self.ai.stop_requested:  # an interrupted iterative deepening still returns a move
+                return
+            self.results[key] = (new_state, symmetry, result, self.ai.stats)
+
+    # the AI must not be used by the caller until this returns
+    def stop(self):
+        if self.thread is not None:
+            self.ai.request_stop()
+            self.thread.join()
+            self.thread = None
+            self.ai.request_stop(False)
+
+    # the pondered search result for game_state, None if it was not searched; the AI statistics
+    # become those of that search
+    def take(self, game_state):
+        key, symmetry = game_state.canonical()
+        found = self.results.get(key)
+        if found is None:
+            return None
+
+        pondered, pondered_symmetry, (score, new_state), stats = found
+        self.ai.stats = stats
+        self.ai.stats.method = '{} (pondered)'.format(stats.method)
+
+        sq = pondered.played_square(new_state)
+        if sq is None:
+            return score, game_state
+        sq = Bitboard.INVERSE_SQUARES[symmetry][Bitboard.SYMMETRY_SQUARES[pondered_symmetry][sq]]
+        return score, game_state.play(sq)
+
+
+# state of a parallel search worker process
+worker_ai = None
+worker_stop = None
+
+
+# the worker's AI searches through the table shared with the parent's AI
+def init_search_worker(tt_entries, words, stop, nr_row, nr_col):
+    global worker_ai, worker_stop
+    setup_board(nr_row, nr_col)
+    worker_ai = AI(1)
+    worker_ai.table = SharedTranspositionTable(tt_entries, words)
+    worker_ai.table_owner = False
+    worker_stop = stop
+
+
+# starts a search in a worker with fresh counters, returns what worker_stats needs
+def start_worker_stats():
+    worker_ai.nodes = 0
+    worker_ai.stats = SearchStats()
+    return worker_ai.table.hits, worker_ai.table.misses, worker_ai.table.overwrites
+
+
+# SearchStats of the worker's search since start_worker_stats, for the parent to add to its own
+def worker_stats(start):
+    stats = worker_ai.stats
+    stats.nodes = worker_ai.nodes
+    stats.tt_hits = worker_ai.table.hits - start[0]
+    stats.tt_misses = worker_ai.table.misses - start[1]
+    stats.tt_overwrites = worker_ai.table.overwrites - start[2]
+    return stats
+
+
+# mini-max score of the root move sq in a worker, with the SearchStats of the search
+def search_root_move(boards, current_player, sq, config):
+    state = GameState(current_player, boards=boards)
+    state.apply_move(sq)
+
+    start = start_worker_stats()
+    worker_ai.set_evaluation(config)
+    score, _ = worker_ai.mini_max_search(state, config.level - 1)
+    return sq, score, worker_stats(start)
+
+
+# a Lazy SMP helper: deepens like the parent's iterative_deepening, odd helpers a ply ahead, until
+# worker_stop is set, which a thread checks every AI.STOP_POLL seconds; returns the SearchStats of the search
+def helper_search(boards, current_player, config, generation, helper):
+    ai = worker_ai
+    start = start_worker_stats()
+    ai.set_evaluation(config)
+    ai.new_search()
+    ai.table.generation = generation
+    state = GameState(current_player, boards=boards)
+    max_depth = state.count_occurrence(Game.EMPTY) if config.move_time_ms > 0 else config.level
+    done = threading.Event()
+
+    def watch():
+        while not done.wait(AI.STOP_POLL):
+            if worker_stop.value:
+                ai.request_stop()
+                return
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        score = None
+        for depth in range(1, max_depth + 1):
+            score, _ = ai.deepening_search(state, min(max_depth, depth + helper % 2), config.algorithm, score)
+    except SearchTimeout:
+        pass
+    finally:
+        done.set()
+        watcher.join()
+        ai.request_stop(False)
+
+    return worker_stats(start)
+
+
+# grows a tree in a worker from its own seed, returns the (square, visits, wins) root moves and the
+# SearchStats, whose nodes are the playouts
+def mcts_root_search(boards, current_player, config, iterations, seed):
+    worker_ai.mcts.rng.seed(seed)
+    worker_ai.mcts.np_rng = None
+    start = start_worker_stats()
+    worker_ai.run_mcts(GameState(current_player, boards=boards), config, iterations)
+    return worker_ai.mcts.root_moves(), worker_stats(start)
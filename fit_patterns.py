@@ -0,0 +1,169 @@
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from timeit import default_timer as timer
+import random
+
+import numpy as np
+
+from core import AI, Game, GameState, SearchConfig
+from patterns import INSTANCES, NR_WEIGHTS, TABLE_OFFSETS, PatternEvaluator, write_patterns
+from records import RecordReader, Records
+
+
+# every position of one game as (text, player to move, final disc difference for Game.P_MAX), the first
+# random_plies moves are random and config plays the rest
+def play_game(seed, random_plies, config):
+    rng = random.Random(seed)
+    ai = AI(config.tt_entries)
+    game_state = GameState()
+    positions = []
+
+    while True:
+        positions.append((game_state.to_text(), game_state.current_player))
+        if game_state.is_final_state():
+            break
+        if game_state.must_pass():
+            game_state = game_state.pass_turn()
+        elif len(positions) <= random_plies:
+            game_state = rng.choice(game_state.generate_new_states())
+        else:
+            _, game_state = ai.make_move(game_state, config)
+
+    score = game_state.count_occurrence(Game.P_MAX) - game_state.count_occurrence(Game.P_MIN)
+    return [(text, player, score) for text, player in positions]
+
+
+def generate(path, games, random_plies, config, seed, workers):
+    start = timer()
+    nr_positions = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(path, 'w') as f:
+        futures = [pool.submit(play_game, seed + game, random_plies, config) for game in range(games)]
+        for done, future in enumerate(futures, 1):
+            for text, player, score in future.result():
+                f.write("{} {} {}\n".format(text, player, score))
+                nr_positions += 1
+            print("\r{}/{} games".format(done, games), end="", flush=True)
+
+    print()
+    print("{} positions written to {} in {:.1f} seconds".format(nr_positions, path, timer() - start))
+
+
+# (cells, scores): per position the 64 cells as 0 empty, 1 Game.P_MAX, 2 Game.P_MIN, and its score; path
+# is a text file of scored positions or a record file with positions, scored by the games' results
+def read_positions(path):
+    with open(path, 'rb') as f:
+        is_record = f.read(len(Records.MAGIC)) == Records.MAGIC
+    if is_record:
+        reader = RecordReader(path)
+        arrays = reader.position_arrays()
+        reader.close()
+        bits = np.arange(64, dtype=np.uint64)
+        cells = ((arrays['p_max'][:, None] >> bits) & 1).astype(np.int64) + \
+            2 * ((arrays['p_min'][:, None] >> bits) & 1).astype(np.int64)
+        return cells, arrays['result'].astype(float)
+
+    texts = []
+    scores = []
+    with open(path) as f:
+        for line in f:
+            text, _, score = line.split()
+            texts.append(text)
+            scores.append(float(score))
+
+    chars = np.frombuffer(''.join(texts).encode('ascii'), dtype=np.uint8).reshape(len(texts), -1)
+    cells = (chars == ord('X')).astype(np.int64) + 2 * (chars == ord('O'))
+    return cells, np.array(scores)
+
+
+# per position, the weight used by every pattern instance, then the constant term
+def feature_columns(cells):
+    columns = np.empty((len(cells), len(INSTANCES) + 1), dtype=np.int64)
+    for instance, (pattern, squares) in enumerate(INSTANCES):
+        columns[:, instance] = TABLE_OFFSETS[pattern] + cells[:, squares] @ (3 ** np.arange(len(squares)))
+    columns[:, -1] = NR_WEIGHTS
+
+    return columns
+
+
+def predict(weights, columns):
+    return weights[columns].sum(axis=1)
+
+
+# ridge regression solved by conjugate gradients on the normal equations, the design matrix has a one
+# in every column listed in columns and is never built
+def fit_stage(columns, scores, ridge, iterations):
+    size = NR_WEIGHTS + 1
+    width = columns.shape[1]
+    flat = columns.ravel()
+
+    def normal(weights):
+        return np.bincount(flat, weights=np.repeat(predict(weights, columns), width), minlength=size) + ridge * weights
+
+    b = np.bincount(flat, weights=np.repeat(scores, width), minlength=size)
+    weights = np.zeros(size)
+    residual = b.copy()
+    direction = residual.copy()
+    residual_norm = residual @ residual
+    for _ in range(iterations):
+        if residual_norm <= 1e-12 * (b @ b):
+            break
+        product = normal(direction)
+        step = residual_norm / (direction @ product)
+        weights += step * direction
+        residual -= step * product
+        new_norm = residual @ residual
+        direction = residual + new_norm / residual_norm * direction
+        residual_norm = new_norm
+
+    return weights
+
+
+def fit(path, output, stages, ridge, iterations):
+    cells, scores = read_positions(path)
+    columns = feature_columns(cells)
+    position_stages = PatternEvaluator.stage((cells != 0).sum(axis=1), stages)
+
+    weights = np.zeros(stages * (NR_WEIGHTS + 1))
+    for stage in range(stages):
+        selected = position_stages == stage
+        start = timer()
+        stage_weights = fit_stage(columns[selected], scores[selected], ridge, iterations)
+        weights[stage * (NR_WEIGHTS + 1):(stage + 1) * (NR_WEIGHTS + 1)] = stage_weights
+
+        error = predict(stage_weights, columns[selected]) - scores[selected]
+        rmse = np.sqrt(np.mean(error ** 2)) if len(error) else 0
+        print("stage {}: {} positions, rmse {:.2f} discs, {:.1f} seconds".format(
+            stage, int(selected.sum()), rmse, timer() - start))
+
+    write_patterns(output, stages, weights)
+    print("weights written to {}".format(output))
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Learns the pattern evaluation weights')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = commands.add_parser('generate', help='Self-play positions scored by the final result')
+    generate_parser.add_argument('--output', default='positions.txt', help='File of scored positions to write')
+    generate_parser.add_argument('--games', type=int, default=1000, help='Number of games')
+    generate_parser.add_argument('--random-plies', type=int, default=10, help='Random moves starting every game')
+    generate_parser.add_argument('--depth', type=int, default=2, help='Alpha-beta depth of the other moves')
+    generate_parser.add_argument('--seed', type=int, default=0, help='Seed of the first game')
+    generate_parser.add_argument('--workers', type=int, default=None, help='Processes playing games')
+
+    fit_parser = commands.add_parser('fit', help='Least squares weights for a file of scored positions')
+    fit_parser.add_argument('positions', help='Lines of position text, player to move and disc difference, '
+                                              'or a record file with positions')
+    fit_parser.add_argument('--output', default='reversi.patterns', help='Weight file to write')
+    fit_parser.add_argument('--stages', type=int, default=4, help='Separate weights for this many game stages')
+    fit_parser.add_argument('--ridge', type=float, default=1.0, help='Penalty on the squared weights')
+    fit_parser.add_argument('--iterations', type=int, default=200, help='Conjugate gradient iterations per stage')
+
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        config = SearchConfig(algorithm=1, level=args.depth, move_time_ms=0, workers=1)
+        generate(args.output, args.games, args.random_plies, config, args.seed, args.workers)
+    elif args.command == 'fit':
+        fit(args.positions, args.output, args.stages, args.ridge, args.iterations)
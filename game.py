@@ -1,385 +1,91 @@
 from argparse import ArgumentParser
-from copy import deepcopy as cpy
 from timeit import default_timer as timer
-import pygame
 import time
 
-dx = [-1, -1, -1, 0, 0, 1, 1, 1]
-dy = [-1, 0, 1, -1, 1, -1, 0, 1]
+from core import AI, Game, GameState, Ponderer, SearchConfig, setup_board
+from records import RecordWriter
 
 
-class Game:
-    NR_ROW = 8
-    NR_COL = 8
-
-    P_MAX = 1
-    P_MIN = 2
-    EMPTY = 0
-
-    LEVEL = 1
-
-    ALGORITHM = 0  # 0 for mini max, 1 for alpha-beta
-
-    MIN_SCORE = -101
-    MAX_SCORE = 101
-
-    def __init__(self):
-        pass
-
-
-class Drawer:
-    CELL_WIDTH = 70
-    CELL_HEIGHT = 70
-    CIRCLE_RADIUS = 30
-
-    BLUE = (102, 153, 255)
-    RED = (255, 102, 102)
-    WHITE = (255, 255, 255)
-    BLACK = (0, 0, 0)
-    GREY = (200, 220, 200)
-
-    def __init__(self):
-        pygame.init()
-        pygame.display.set_caption('REVERSI GAME')
-        self.X_Min = 0
-        self.X_Max = Game.NR_COL * Drawer.CELL_WIDTH - 1
-        self.Y_Min = 0
-        self.Y_Max = Game.NR_ROW * Drawer.CELL_HEIGHT - 1
-        self.screen = pygame.display.set_mode(size=(self.X_Max + 1, self.Y_Max + 1))
-        self.clear_screen()
+class Engine:
+    def __init__(self, player=0):
+        self.game_state = GameState()
+        self.drawer = None  # created by run_with_gui, the console game never loads pygame
+        self.AI = AI()
+        self.AI.timing = Game.STATS
+        self.ponderer = Ponderer(self.AI)
+        self.player = player
 
-    def clear_screen(self):
-        self.screen.fill(Drawer.WHITE)
-        pygame.display.update()
+        # moves of the game and, if the record file keeps them, the positions before them
+        self.records = None
+        self.record_moves = []
+        self.record_positions = []
+        if Game.RECORD_PATH is not None:
+            self.records = RecordWriter(Game.RECORD_PATH, Game.NR_ROW, Game.NR_COL, Game.RECORD_POSITIONS)
 
-    def console_print(self, game_state):
+    def console_print(self):
         print()
-        print("Player", game_state.current_player)
+        print("Player", self.game_state.current_player)
         print()
         print("", end=" ")
         for i in range(Game.NR_COL):
             print("|", i, end="")
         print()
-        for idx, line in enumerate(game_state.grid):
+        for idx, line in enumerate(self.game_state.grid):
             print(idx, line)
 
         print()
 
-    def draw_circle(self, color, center):
-        pygame.draw.circle(self.screen, color, center, Drawer.CIRCLE_RADIUS)
-
-    def draw_line(self, color, a, b, width):
-        pygame.draw.line(self.screen, color, a, b, width)
-
-    def draw(self, game_state):
-        self.screen.fill(Drawer.WHITE)
-
-        for i in range(Game.NR_ROW):
-            for j in range(Game.NR_COL):
-                if game_state.grid[i][j] == Game.P_MAX:
-                    self.draw_circle(Drawer.BLUE, (j * Drawer.CELL_WIDTH + Drawer.CELL_WIDTH // 2, i * Drawer.CELL_HEIGHT + Drawer.CELL_HEIGHT // 2))
-                elif game_state.grid[i][j] == Game.P_MIN:
-                    self.draw_circle(Drawer.RED, (j * Drawer.CELL_WIDTH + Drawer.CELL_WIDTH // 2, i * Drawer.CELL_HEIGHT + Drawer.CELL_HEIGHT // 2))
-
-        # valid moves
-        for i in range(Game.NR_ROW):
-            for j in range(Game.NR_COL):
-                fl, _ = game_state.valid_move(i, j, game_state.current_player)
-                if fl is True:
-                    self.draw_circle(Drawer.GREY, (j * Drawer.CELL_WIDTH + Drawer.CELL_WIDTH // 2, i * Drawer.CELL_HEIGHT + Drawer.CELL_HEIGHT // 2))
-
-        for i in range(Game.NR_COL):
-            self.draw_line(Drawer.BLACK, (i * Drawer.CELL_WIDTH, 0), (i * Drawer.CELL_WIDTH, self.Y_Max), 3)
-
-        for i in range(Game.NR_ROW):
-            self.draw_line(Drawer.BLACK, (0, i * Drawer.CELL_HEIGHT), (self.X_Max, i * Drawer.CELL_HEIGHT), 3)
-
-        pygame.display.update()
-
-
-class GameState:
-    def __init__(self, current_player=Game.P_MAX, grid=None):
-        self.current_player = current_player
-
-        if grid is None:
-            self.grid = [[Game.EMPTY for i in range(Game.NR_COL)] for i in range(Game.NR_ROW)]
-            self.grid[3][3] = self.grid[4][4] = Game.P_MAX
-            self.grid[3][4] = self.grid[4][3] = Game.P_MIN
-        else:
-            self.grid = grid
-
-    def opponent(self):
-        if self.current_player == Game.P_MAX:
-            return Game.P_MIN
-        else:
-            return Game.P_MAX
-
-    def opponent_player(self, player):
-        if player == Game.P_MAX:
-            return Game.P_MIN
-        else:
-            return Game.P_MAX
-
-    def switch_player(self):
-        self.current_player = self.opponent()
-
-    def valid_move(self, x, y, player):
-        if x < 0 or y < 0 or x >= Game.NR_ROW or y >= Game.NR_COL:
-            return False, []
-
-        if self.grid[x][y] != Game.EMPTY:
-            return False, []
-
-        flag = False
-        opponent_disks = [[x, y]]
-        for k in range(8):
-            i = x
-            j = y
-            current_flag = False
-            lst = []
-            while True:
-                i += dx[k]
-                j += dy[k]
-
-                if i < 0 or j < 0 or i >= Game.NR_ROW or j >= Game.NR_COL:
-                    break
-
-                if self.grid[i][j] == Game.EMPTY:
-                    break
-
-                if self.grid[i][j] == player and len(lst) == 0:
-                    break
-
-                if self.grid[i][j] == self.opponent_player(player):
-                    lst.append([i, j])
-                    continue
-
-                if self.grid[i][j] == player:
-                    current_flag = True
-                    break
-
-            if current_flag is True:
-                flag = True
-                opponent_disks.extend(lst)
-
-        return flag, opponent_disks
-
-    def count_moves(self, player):
-        cnt = 0
-        for i in range(Game.NR_ROW):
-            for j in range(Game.NR_COL):
-                flag, _ = self.valid_move(i, j, player)
-                if flag is True:
-                    cnt += 1
-
-        return cnt
-
-    def can_advance(self):
-        for i in range(Game.NR_ROW):
-            for j in range(Game.NR_COL):
-                flag, _ = self.valid_move(i, j, self.current_player)
-
-                if flag is True:
-                    return True
-
-        return False
-
-    def is_final_state(self):
-        return not self.can_advance()
-
-    def generate_new_state(self, lst):
-        grid = cpy(self.grid)
-        for el in lst:
-            grid[el[0]][el[1]] = self.current_player
-
-        new_state = GameState(self.opponent(), grid)
-        return new_state
-
-    def generate_new_states(self):
-        new_states = []
-
-        for i in range(Game.NR_ROW):
-            for j in range(Game.NR_COL):
-                flag, lst = self.valid_move(i, j, self.current_player)
-                if flag is False:
-                    continue
-
-                new_states.append(self.generate_new_state(lst))
-
-        return new_states
-
-    def make_move(self, x, y):
-        fl, lst = self.valid_move(x, y, self.current_player)
-        if fl is False:
-            return False, self
-
-        return True, self.generate_new_state(lst)
-
-    # calculates score for Game.P_MAX
-    def get_score(self):
-        return self.get_score_1()
-
-    def get_score_1(self):
-        p_max_score = 0
-        p_min_score = 0
-        for i in range(Game.NR_ROW):
-            for j in range(Game.NR_COL):
-                if self.grid[i][j] == Game.P_MAX:
-                    if (i == 0 or i == Game.NR_ROW - 1) and (j == 0 or j == Game.NR_COL - 1):
-                        p_max_score += 4  # grid corner
-                    elif i == 0 or i == Game.NR_ROW - 1 or j == 0 or j == Game.NR_COL - 1:
-                        p_max_score += 2  # grid side
-                    else:
-                        p_max_score += 1  # any other cell
-                elif self.grid[i][j] == Game.P_MIN:
-                    if (i == 0 or i == Game.NR_ROW - 1) and (j == 0 or j == Game.NR_COL - 1):
-                        p_min_score += 4  # grid corner
-                    elif i == 0 or i == Game.NR_ROW - 1 or j == 0 or j == Game.NR_COL - 1:
-                        p_min_score += 2  # grid side
-                    else:
-                        p_min_score += 1  # any other cell
-
-        return 100 * (p_max_score - p_min_score) / (p_max_score + p_min_score)
-
-    def get_score_2(self):
-        return 0.4 * self.get_parity_score() + 0.3 * self.get_corners_score() + 0.3 * self.get_mobility_score()
-
-    # between -100 and 100
-    def get_parity_score(self):
-        p_max_occ = self.count_occurrence(Game.P_MAX)
-        p_min_occ = self.count_occurrence(Game.P_MIN)
-        return 100 * (p_max_occ - p_min_occ) / (p_max_occ + p_min_occ)
-
-    # between -100 and 100
-    def get_mobility_score(self):
-        p_max_mobility = self.count_moves(Game.P_MAX)
-        p_min_mobility = self.count_moves(Game.P_MIN)
-        if (p_max_mobility + p_min_mobility) > 0:
-            return 100 * (p_max_mobility - p_min_mobility) / (p_max_mobility + p_min_mobility)
-        else:
-            return 0
-
-    # between -100 and 100
-    def get_corners_score(self):
-        p_max_corners_cnt = 0
-        p_min_corners_cnt = 0
-        for i in range(Game.NR_ROW):
-            for j in range(Game.NR_COL):
-                if (i == 0 or i == Game.NR_ROW - 1) and (j == 0 or j == Game.NR_COL - 1):
-                    if self.grid[i][j] == Game.P_MAX:
-                        p_max_corners_cnt += 1
-                    else:
-                        p_min_corners_cnt += 1
-
-        if (p_max_corners_cnt + p_min_corners_cnt) > 0:
-            return 100 * (p_max_corners_cnt - p_min_corners_cnt) / (p_max_corners_cnt + p_min_corners_cnt)
-        else:
-            return 0
-
-    def count_occurrence(self, ch):
-        return sum([line.count(ch) for line in self.grid])
-
-    def get_winner(self):
-        if self.is_final_state() is False:
-            return None
-
-        player_1_score = self.count_occurrence(Game.P_MAX)
-        player_2_score = self.count_occurrence(Game.P_MIN)
-
-        if player_1_score > player_2_score:
-            return Game.P_MAX
-        elif player_2_score > player_1_score:
-            return Game.P_MIN
-        elif player_1_score == player_2_score:
-            return "Tie"
-
-        return None
-
-
-class AI:
-    def __init__(self):
-        pass
-
-    def mini_max(self, game_state, depth):
-        if depth == 0 or game_state.is_final_state() is True:
-            return game_state.get_score(), game_state
-
-        if game_state.current_player == Game.P_MAX:  # we maximize score
-            score = Game.MIN_SCORE
-            new_states = game_state.generate_new_states()
-            for new_state in new_states:
-                new_score, _ = self.mini_max(new_state, depth - 1)
-                if new_score > score:
-                    score = new_score
-                    game_state = new_state
-        else:  # we minimize score
-            score = Game.MAX_SCORE
-            new_states = game_state.generate_new_states()
-            for new_state in new_states:
-                new_score, _ = self.mini_max(new_state, depth - 1)
-                if new_score < score:
-                    score = new_score
-                    game_state = new_state
-
-        return score, game_state
-
-    def alpha_beta(self, game_state, depth, alpha, beta):
-        if depth == 0 or game_state.is_final_state():
-            return game_state.get_score(), game_state
-
-        if game_state.current_player == Game.P_MAX:  # we maximize score
-            score = Game.MIN_SCORE
-            new_states = game_state.generate_new_states()
-            for new_state in new_states:
-                new_score, _ = self.alpha_beta(new_state, depth - 1, alpha, beta)
-                if new_score > score:
-                    score = new_score
-                    game_state = new_state
-                alpha = max(alpha, new_score)
-                if alpha >= beta:
-                    break
-        else:  # we minimize score
-            score = Game.MAX_SCORE
-            new_states = game_state.generate_new_states()
-            for new_state in new_states:
-                new_score, _ = self.alpha_beta(new_state, depth - 1, alpha, beta)
-                if new_score < score:
-                    score = new_score
-                    game_state = new_state
-                beta = min(beta, new_score)
-                if alpha >= beta:
-                    break
-
-        return score, game_state
-
-    def make_move(self, game_state):
-        if Game.ALGORITHM == 0:
-            return self.mini_max(game_state, Game.LEVEL)
-        elif Game.ALGORITHM == 1:
-            return self.alpha_beta(game_state, Game.LEVEL, Game.MIN_SCORE, Game.MAX_SCORE)
-        else:
-            raise Exception('unknown algorithm')
-
-
-class Engine:
-    def __init__(self, player=0):
-        self.game_state = GameState()
-        self.drawer = Drawer()
-        self.AI = AI()
-        self.player = player
-
     def get_grid_coordinates(self, mouse_coord):
         x = mouse_coord[0] // self.drawer.CELL_WIDTH
         y = mouse_coord[1] // self.drawer.CELL_HEIGHT
 
         return y, x
 
+    # moves on to new_state, score is the AI's when it chose the move
+    def advance(self, new_state, score=None):
+        if self.records is not None:
+            self.record_moves.append(self.game_state.played_square(new_state))
+            if self.records.positions:
+                self.record_positions.append((self.game_state.boards[Game.P_MAX], self.game_state.boards[Game.P_MIN],
+                                              score))
+        self.game_state = new_state
+
+    # appends the game to the record file once, finished is False for a game the human quit or that
+    # ended with an error or Ctrl-C
+    def save_record(self, finished):
+        if self.records is None:
+            return
+
+        records = self.records
+        self.records = None
+        result = self.game_state.count_occurrence(Game.P_MAX) - self.game_state.count_occurrence(Game.P_MIN)
+        try:
+            records.write_game(self.record_moves, result, finished,
+                               self.record_positions if records.positions else None)
+        finally:
+            records.close()
+
+    def start_pondering(self):
+        if Game.PONDER:
+            self.ponderer.start(self.game_state, SearchConfig())
+
+    def ai_move(self):
+        if Game.PONDER:
+            self.ponderer.stop()
+            result = self.ponderer.take(self.game_state)
+            if result is not None:
+                return result
+
+        return self.AI.make_move(self.game_state)
+
     def game_menu(self):
         nr = 1
         while True:
             try:
-                nr = int(input("Algorithm type:\n  1) Press 1 for mini-max.\n  2) Press 2 for alpha_beta.\n"))
-                if nr != 1 and nr != 2:
+                nr = int(input("Algorithm type:\n  1) Press 1 for mini-max.\n  2) Press 2 for alpha_beta.\n"
+                               "  3) Press 3 for Monte Carlo tree search.\n  4) Press 4 for principal variation search.\n"
+                               "  5) Press 5 for alpha-beta with aspiration windows.\n  6) Press 6 for MTD(f).\n"))
+                if nr < 1 or nr > 6:
                     print("Invalid algorithm choice. Please try again.")
                     continue
             except Exception as e:
@@ -401,6 +107,10 @@ class Engine:
         self.player = nr
         turn = self.player - 1
 
+        # MCTS is limited by --mcts-iterations or --move-time-ms instead of a level
+        if (Game.ALGORITHM in (1, 3, 4, 5) and Game.MOVE_TIME_MS > 0) or Game.ALGORITHM == 2:
+            return turn
+
         while True:
             try:
                 nr = int(input("Choose your difficulty level\n  1) Press 1 for easy.\n  2) Press 2 for medium.\n  3) Press 3 for difficult.\n"))
@@ -416,6 +126,10 @@ class Engine:
         return turn
 
     def run_with_gui(self):
+        import pygame
+        from gui import Drawer
+
+        self.drawer = Drawer()
         game_start_time = timer()
         turn = self.game_menu()
         your_moves_cnt = 0
@@ -423,55 +137,70 @@ class Engine:
 
         game_over = False
         while not game_over:
-            # self.drawer.console_print(self.game_state)
+            # self.console_print()
             self.drawer.draw(self.game_state)
 
             if self.game_state.is_final_state():
                 game_over = True
                 continue
 
+            if self.game_state.must_pass():
+                print("{} has no valid moves and passes.\n".format("You" if turn == 0 else "AI"))
+                self.advance(self.game_state.pass_turn())
+                turn = 1 - turn
+                continue
+
             if turn == 0:
                 move_start_time = timer()
                 print("Your turn.")
+                self.start_pondering()
                 made_move = False
                 while not made_move:
-                    for event in pygame.event.get():
-                        if event.type == pygame.QUIT:
-                            pygame.quit()
-                            print("You did {} moves".format(your_moves_cnt))
-                            print("AI did {} moves".format(ai_moves_cnt))
-                            your_score = self.game_state.count_occurrence(self.player)
-                            ai_score = self.game_state.count_occurrence(self.game_state.opponent_player(self.player))
-                            print("Your score is {}.".format(your_score))
-                            print("AI's score is {}.\n".format(ai_score))
-                            print("Game total time was {} seconds.\n".format(timer() - game_start_time))
-                            print("You quited game.\nBye.\n")
-                            return
-                        elif event.type == pygame.MOUSEBUTTONDOWN:
-                            mouse_coord = pygame.mouse.get_pos()
-                            x, y = self.get_grid_coordinates(mouse_coord)
-                            # print(x, y)
-
-                            fl, self.game_state = self.game_state.make_move(x, y)
-                            if fl is False:
-                                print("Invalid move. Please try again\n")
-                                continue
-
-                            made_move = True
-                            turn = 1 - turn
-                            your_moves_cnt += 1
-                            print("Your think time was {} seconds.\n".format(timer() - move_start_time))
-                            break
+                    # blocks without using the CPU until the next event
+                    event = pygame.event.wait()
+                    if event.type == pygame.QUIT:
+                        pygame.quit()
+                        print("You did {} moves".format(your_moves_cnt))
+                        print("AI did {} moves".format(ai_moves_cnt))
+                        your_score = self.game_state.count_occurrence(self.player)
+                        ai_score = self.game_state.count_occurrence(self.game_state.opponent_player(self.player))
+                        print("Your score is {}.".format(your_score))
+                        print("AI's score is {}.\n".format(ai_score))
+                        print("Game total time was {} seconds.\n".format(timer() - game_start_time))
+                        print("You quited game.\nBye.\n")
+                        self.ponderer.stop()
+                        self.save_record(False)
+                        return
+                    elif event.type == pygame.MOUSEBUTTONDOWN:
+                        mouse_coord = pygame.mouse.get_pos()
+                        x, y = self.get_grid_coordinates(mouse_coord)
+                        # print(x, y)
+
+                        fl, new_state = self.game_state.make_move(x, y)
+                        if fl is False:
+                            print("Invalid move. Please try again\n")
+                            continue
+                        self.advance(new_state)
+
+                        made_move = True
+                        turn = 1 - turn
+                        your_moves_cnt += 1
+                        print("Your think time was {} seconds.\n".format(timer() - move_start_time))
             else:
                 print("AI's turn.")
                 time.sleep(0.5)
                 move_start_time = timer()
-                _, self.game_state = self.AI.make_move(self.game_state)
+                score, new_state = self.ai_move()
+                self.advance(new_state, score)
                 ai_moves_cnt += 1
                 turn = 1 - turn
                 print("AI's think time was {} seconds.\n".format(timer() - move_start_time))
+                if Game.STATS:
+                    print(self.AI.stats.report() + "\n")
             pass
 
+        self.ponderer.stop()
+        self.save_record(True)
         print("Game over.")
         print("You did {} moves".format(your_moves_cnt))
         print("AI did {} moves".format(ai_moves_cnt))
@@ -488,10 +217,8 @@ class Engine:
 
         exit_game = False
         while not exit_game:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    exit_game = True
-                    break
+            if pygame.event.wait().type == pygame.QUIT:
+                exit_game = True
 
         pygame.quit()
         print("Game total time was {} seconds.\n".format(timer() - game_start_time))
@@ -505,20 +232,26 @@ class Engine:
 
         game_over = False
         while not game_over:
-            self.drawer.console_print(self.game_state)
+            self.console_print()
 
             if self.game_state.is_final_state():
                 game_over = True
                 continue
 
+            if self.game_state.must_pass():
+                print("{} has no valid moves and passes.\n".format("You" if turn == 0 else "AI"))
+                self.advance(self.game_state.pass_turn())
+                turn = 1 - turn
+                continue
+
             if turn == 0:
                 move_start_time = timer()
                 print("Your turn.")
+                self.start_pondering()
                 made_move = False
                 while not made_move:
                     line = input("Give i and j\n\n")
                     if line == "exit":
-                        pygame.quit()
                         print("You did {} moves".format(your_moves_cnt))
                         print("AI did {} moves".format(ai_moves_cnt))
                         your_score = self.game_state.count_occurrence(self.player)
@@ -527,6 +260,8 @@ class Engine:
                         print("AI's score is {}.\n".format(ai_score))
                         print("Game total time was {} seconds.\n".format(timer() - game_start_time))
                         print("You quited game.\nBye.\n")
+                        self.ponderer.stop()
+                        self.save_record(False)
                         return
 
                     try:
@@ -537,10 +272,11 @@ class Engine:
 
                     # print(x, y)
 
-                    fl, self.game_state = self.game_state.make_move(x, y)
+                    fl, new_state = self.game_state.make_move(x, y)
                     if fl is False:
                         print("Invalid move. Please try again\n")
                         continue
+                    self.advance(new_state)
 
                     made_move = True
                     turn = 1 - turn
@@ -550,12 +286,17 @@ class Engine:
                 print("AI's turn.")
                 time.sleep(0.5)
                 move_start_time = timer()
-                _, self.game_state = self.AI.make_move(self.game_state)
+                score, new_state = self.ai_move()
+                self.advance(new_state, score)
                 ai_moves_cnt += 1
                 turn = 1 - turn
                 print("AI's think time was {} seconds.\n".format(timer() - move_start_time))
+                if Game.STATS:
+                    print(self.AI.stats.report() + "\n")
             pass
 
+        self.ponderer.stop()
+        self.save_record(True)
         print("Game over.")
         print("You did {} moves".format(your_moves_cnt))
         print("AI did {} moves".format(ai_moves_cnt))
@@ -570,14 +311,27 @@ class Engine:
         else:
             print("AI won with the score {}-{}.\n".format(ai_score, your_score))
 
-        pygame.quit()
         print("Game total time was {} seconds.\n".format(timer() - game_start_time))
         print("You quited game.\nBye.\n")
 
 
 if __name__ == '__main__':
     parser = ArgumentParser(usage=__file__ + ' '
-                                             '--gui GUI',
+                                             '--gui GUI '
+                                             '--board-size SIZE '
+                                             '--move-time-ms MS '
+                                             '--workers N '
+                                             '--endgame-empties N '
+                                             '--mcts-iterations N '
+                                             '--mcts-batch N '
+                                             '--book PATH '
+                                             '--evaluation N '
+                                             '--patterns PATH '
+                                             '--ponder PONDER '
+                                             '--stats STATS '
+                                             '--profile MODE '
+                                             '--record PATH '
+                                             '--record-positions RECORD_POSITIONS',
                             description='Reversi game')
 
     parser.add_argument('--gui',
@@ -585,15 +339,130 @@ if __name__ == '__main__':
                         default='0',
                         help='Flag for gui usage')
 
+    parser.add_argument('--board-size',
+                        dest='board_size',
+                        default='{}'.format(Game.NR_ROW),
+                        help='Even number of rows and columns, or ROWSxCOLUMNS, e.g. 8, 10, 12 or 16')
+
+    parser.add_argument('--move-time-ms',
+                        dest='move_time_ms',
+                        type=int,
+                        default=0,
+                        help='Think time per move in milliseconds of every algorithm but mini-max, replaces the difficulty level')
+
+    parser.add_argument('--workers',
+                        dest='workers',
+                        type=int,
+                        default=1,
+                        help='Processes sharing a search: Lazy SMP for the alpha-beta algorithms, root split for '
+                             'mini-max and root parallel for MCTS')
+
+    parser.add_argument('--endgame-empties',
+                        dest='endgame_empties',
+                        type=int,
+                        default=Game.ENDGAME_EMPTIES,
+                        help='Solve the game exactly once this many empty cells are left, 0 to disable')
+
+    parser.add_argument('--mcts-iterations',
+                        dest='mcts_iterations',
+                        type=int,
+                        default=Game.MCTS_ITERATIONS,
+                        help='MCTS iterations per move when there is no think time')
+
+    parser.add_argument('--mcts-batch',
+                        dest='mcts_batch',
+                        type=int,
+                        default=0,
+                        help='Random games played at once with NumPy from every new MCTS leaf, 0 to play one at a time')
+
+    parser.add_argument('--book',
+                        dest='book',
+                        default=None,
+                        help='Opening book file made by build_book.py')
+
+    parser.add_argument('--evaluation',
+                        dest='evaluation',
+                        type=int,
+                        default=Game.EVALUATION,
+                        choices=[1, 2, 3],
+                        help='1 for weighted discs, 2 for parity, corners and mobility, 3 for patterns')
+
+    parser.add_argument('--patterns',
+                        dest='patterns',
+                        default=None,
+                        help='Pattern weights made by fit_patterns.py, untrained weights if missing')
+
+    parser.add_argument('--ponder',
+                        dest='ponder',
+                        default='0',
+                        help='Flag for searching while you think')
+
+    parser.add_argument('--stats',
+                        dest='stats',
+                        default='0',
+                        help='Flag for printing search statistics after every AI move')
+
+    parser.add_argument('--profile',
+                        dest='profile',
+                        default=None,
+                        choices=['cprofile', 'sample'],
+                        help='Profile the first AI move')
+
+    parser.add_argument('--profile-output',
+                        dest='profile_output',
+                        default=None,
+                        help='File for the profile, printed if missing')
+
+    parser.add_argument('--record',
+                        dest='record',
+                        default=None,
+                        help='Record file the game is appended to')
+
+    parser.add_argument('--record-positions',
+                        dest='record_positions',
+                        default='0',
+                        help='Flag for recording the position and AI score before every move')
+
     # Parse arguments
     args = vars(parser.parse_args())
     gui = args['gui']
+    try:
+        nr_row, _, nr_col = args['board_size'].lower().partition('x')
+        setup_board(int(nr_row), int(nr_col or nr_row))
+    except ValueError as e:
+        parser.error('bad --board-size {}: {}'.format(args['board_size'], e))
+    if Game.NR_ROW * Game.NR_COL > 64:
+        # these keep boards in 64 bit words
+        if args['mcts_batch'] > 0:
+            parser.error('--mcts-batch needs a board of at most 64 cells')
+        if args['record_positions'] == '1':
+            parser.error('--record-positions needs a board of at most 64 cells')
+    if args['evaluation'] == 3 and (Game.NR_ROW != 8 or Game.NR_COL != 8):
+        parser.error('--evaluation 3 needs an 8x8 board')
+    Game.MOVE_TIME_MS = args['move_time_ms']
+    Game.WORKERS = args['workers']
+    Game.ENDGAME_EMPTIES = args['endgame_empties']
+    Game.MCTS_ITERATIONS = args['mcts_iterations']
+    Game.MCTS_BATCH = args['mcts_batch']
+    Game.BOOK_PATH = args['book']
+    Game.EVALUATION = args['evaluation']
+    Game.PATTERNS_PATH = args['patterns']
+    Game.PONDER = args['ponder'] == '1'
+    Game.STATS = args['stats'] == '1'
+    Game.RECORD_PATH = args['record']
+    Game.RECORD_POSITIONS = args['record_positions'] == '1'
 
     game_engine = Engine()
+    game_engine.AI.profile_next = args['profile']
+    game_engine.AI.profile_output = args['profile_output']
 
-    if gui == '1':
-        game_engine.run_with_gui()
-    else:
-        game_engine.run()
+    # a game cut short by Ctrl-C or an error is still saved, as unfinished
+    try:
+        if gui == '1':
+            game_engine.run_with_gui()
+        else:
+            game_engine.run()
+    finally:
+        game_engine.save_record(False)
 
     pass
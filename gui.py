@@ -0,0 +1,90 @@
+import pygame
+
+from core import Bitboard, Game
+
+
+class Drawer:
+    CELL_WIDTH = 70
+    CELL_HEIGHT = 70
+    CIRCLE_RADIUS = 30
+    MAX_BOARD_PIXELS = 840  # cells shrink below CELL_WIDTH so that large boards fit on the screen
+
+    BLUE = (102, 153, 255)
+    RED = (255, 102, 102)
+    WHITE = (255, 255, 255)
+    BLACK = (0, 0, 0)
+    GREY = (200, 220, 200)
+
+    def __init__(self):
+        pygame.init()
+        pygame.display.set_caption('REVERSI GAME')
+        cell = min(70, Drawer.MAX_BOARD_PIXELS // max(Game.NR_ROW, Game.NR_COL))
+        Drawer.CELL_WIDTH = Drawer.CELL_HEIGHT = cell
+        Drawer.CIRCLE_RADIUS = cell * 3 // 7
+        self.X_Min = 0
+        self.X_Max = Game.NR_COL * Drawer.CELL_WIDTH - 1
+        self.Y_Min = 0
+        self.Y_Max = Game.NR_ROW * Drawer.CELL_HEIGHT - 1
+        self.screen = pygame.display.set_mode(size=(self.X_Max + 1, self.Y_Max + 1))
+        self.clear_screen()
+
+        # color drawn in every cell, False until the cell is drawn for the first time
+        self.cells = [[False for j in range(Game.NR_COL)] for i in range(Game.NR_ROW)]
+
+    def clear_screen(self):
+        self.screen.fill(Drawer.WHITE)
+        pygame.display.update()
+
+    def draw_circle(self, color, center):
+        pygame.draw.circle(self.screen, color, center, Drawer.CIRCLE_RADIUS)
+
+    def draw_line(self, color, a, b, width):
+        pygame.draw.line(self.screen, color, a, b, width)
+
+    # redraws cell (i, j) with a disc or hint of the given color, None for an empty cell,
+    # and returns the screen area that changed
+    def draw_cell(self, i, j, color):
+        x = j * Drawer.CELL_WIDTH
+        y = i * Drawer.CELL_HEIGHT
+        rect = pygame.Rect(x, y, Drawer.CELL_WIDTH, Drawer.CELL_HEIGHT)
+
+        self.screen.fill(Drawer.WHITE, rect)
+        if color is not None:
+            self.draw_circle(color, (x + Drawer.CELL_WIDTH // 2, y + Drawer.CELL_HEIGHT // 2))
+
+        # the grid has no line along the right and bottom sides of the board
+        self.draw_line(Drawer.BLACK, (x, y), (x, y + Drawer.CELL_HEIGHT), 3)
+        self.draw_line(Drawer.BLACK, (x, y), (x + Drawer.CELL_WIDTH, y), 3)
+        if j + 1 < Game.NR_COL:
+            self.draw_line(Drawer.BLACK, (x + Drawer.CELL_WIDTH, y), (x + Drawer.CELL_WIDTH, y + Drawer.CELL_HEIGHT), 3)
+        if i + 1 < Game.NR_ROW:
+            self.draw_line(Drawer.BLACK, (x, y + Drawer.CELL_HEIGHT), (x + Drawer.CELL_WIDTH, y + Drawer.CELL_HEIGHT), 3)
+
+        return rect.inflate(4, 4).clip(self.screen.get_rect())
+
+    # only cells whose disc or hint changed since the last call are redrawn and sent to the display
+    def draw(self, game_state):
+        p_max_board = game_state.boards[Game.P_MAX]
+        p_min_board = game_state.boards[Game.P_MIN]
+        hints = game_state.legal_moves()
+
+        rects = []
+        for i in range(Game.NR_ROW):
+            for j in range(Game.NR_COL):
+                bit = 1 << Bitboard.square(i, j)
+                if p_max_board & bit:
+                    color = Drawer.BLUE
+                elif p_min_board & bit:
+                    color = Drawer.RED
+                elif hints & bit:
+                    color = Drawer.GREY  # valid move
+                else:
+                    color = None
+
+                if self.cells[i][j] == color:
+                    continue
+                self.cells[i][j] = color
+                rects.append(self.draw_cell(i, j, color))
+
+        if rects:
+            pygame.display.update(rects)
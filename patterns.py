@@ -0,0 +1,183 @@
+from array import array
+from operator import getitem
+import struct
+
+# pattern evaluation for the 8x8 board: every pattern cell is a base 3 digit (0 empty, 1 first player, 2 second
+# player), the digits of one pattern instance form an index into the weight table shared by all the
+# symmetric instances of that pattern, and the score is the sum of the looked up weights
+
+SIZE = 8
+
+# (name, cells as (row, column)), digit k of a table index is the k-th cell
+PATTERNS = [
+    ('edge_x', [(0, j) for j in range(SIZE)] + [(1, 1), (1, SIZE - 2)]),
+    ('corner_2x5', [(i, j) for i in range(2) for j in range(5)]),
+    ('corner_3x3', [(i, j) for i in range(3) for j in range(3)]),
+    ('line_2', [(1, j) for j in range(SIZE)]),
+    ('line_3', [(2, j) for j in range(SIZE)]),
+    ('line_4', [(3, j) for j in range(SIZE)]),
+    ('diagonal_8', [(i, i) for i in range(8)]),
+    ('diagonal_7', [(i, i + 1) for i in range(7)]),
+    ('diagonal_6', [(i, i + 2) for i in range(6)]),
+    ('diagonal_5', [(i, i + 3) for i in range(5)]),
+    ('diagonal_4', [(i, i + 4) for i in range(4)]),
+]
+
+# the rotations and reflections of the board
+SYMMETRIES = [
+    lambda i, j: (i, j),
+    lambda i, j: (i, SIZE - 1 - j),
+    lambda i, j: (SIZE - 1 - i, j),
+    lambda i, j: (SIZE - 1 - i, SIZE - 1 - j),
+    lambda i, j: (j, i),
+    lambda i, j: (j, SIZE - 1 - i),
+    lambda i, j: (SIZE - 1 - j, i),
+    lambda i, j: (SIZE - 1 - j, SIZE - 1 - i),
+]
+
+
+# corners 4, sides 2 and any other cell 1, as in GameState.get_score_1
+def cell_weight(i, j):
+    return 1 + (i in (0, SIZE - 1) or j in (0, SIZE - 1)) + 2 * (i in (0, SIZE - 1) and j in (0, SIZE - 1))
+
+
+def setup():
+    global TABLE_SIZES, TABLE_OFFSETS, NR_WEIGHTS, INSTANCES, PLACED, FLIPPED
+
+    TABLE_SIZES = [3 ** len(cells) for _, cells in PATTERNS]
+    TABLE_OFFSETS = []
+    NR_WEIGHTS = 0
+    for size in TABLE_SIZES:
+        TABLE_OFFSETS.append(NR_WEIGHTS)
+        NR_WEIGHTS += size
+
+    # (pattern, squares in digit order) for every distinct symmetric instance
+    INSTANCES = []
+    for pattern, (_, cells) in enumerate(PATTERNS):
+        seen = set()
+        for symmetry in SYMMETRIES:
+            squares = [i * SIZE + j for i, j in (symmetry(i, j) for i, j in cells)]
+            if frozenset(squares) not in seen:
+                seen.add(frozenset(squares))
+                INSTANCES.append((pattern, squares))
+
+    # (first player?, undo?) -> per square, (instance, index change) when the player puts a disc there and
+    # when the player flips the disc there
+    PLACED = {}
+    FLIPPED = {}
+    for first_player in (True, False):
+        for undo in (False, True):
+            sign = -1 if undo else 1
+            placed = PLACED[first_player, undo] = [[] for _ in range(SIZE * SIZE)]
+            flipped = FLIPPED[first_player, undo] = [[] for _ in range(SIZE * SIZE)]
+            for instance, (_, squares) in enumerate(INSTANCES):
+                for k, sq in enumerate(squares):
+                    placed[sq].append((instance, sign * (1 if first_player else 2) * 3 ** k))
+                    flipped[sq].append((instance, sign * (-1 if first_player else 1) * 3 ** k))
+
+
+setup()
+
+
+# index of every pattern instance, in the order of INSTANCES
+def instance_indices(p_max, p_min):
+    indices = []
+    for _, squares in INSTANCES:
+        idx = 0
+        for k, sq in enumerate(squares):
+            idx += 3 ** k * ((p_max >> sq & 1) + 2 * (p_min >> sq & 1))
+        indices.append(idx)
+
+    return indices
+
+
+# indices after a move on sq flipping the discs in flipped, or before it when undo is True
+def update_indices(indices, first_player, sq, flipped, undo=False):
+    for instance, change in PLACED[first_player, undo][sq]:
+        indices[instance] += change
+
+    changes = FLIPPED[first_player, undo]
+    while flipped:
+        low = flipped & -flipped
+        for instance, change in changes[low.bit_length() - 1]:
+            indices[instance] += change
+        flipped ^= low
+
+
+class PatternEvaluator:
+    MAGIC = b'RVPT'
+    VERSION = 1
+    HEADER = struct.Struct('<4sHHI')  # magic, version, number of stages, weights per stage
+
+    def __init__(self, path=None):
+        self.path = path
+        if path is None:
+            self.stages = 1
+            self.weights = PatternEvaluator.default_weights()
+        else:
+            self.stages, self.weights = PatternEvaluator.read(path)
+
+        # per stage, the weight table of every instance in the order of INSTANCES, and the constant term
+        self.tables = []
+        self.biases = []
+        stride = NR_WEIGHTS + 1
+        for stage in range(self.stages):
+            base = stage * stride
+            tables = [self.weights[base + offset:base + offset + size] for offset, size in zip(TABLE_OFFSETS, TABLE_SIZES)]
+            self.tables.append([tables[pattern] for pattern, _ in INSTANCES])
+            self.biases.append(self.weights[base + NR_WEIGHTS])
+
+    # used without a weight file: cell_weight of every cell spread over the instances covering it
+    @staticmethod
+    def default_weights():
+        coverage = [0] * (SIZE * SIZE)
+        for _, squares in INSTANCES:
+            for sq in squares:
+                coverage[sq] += 1
+
+        weights = array('f')
+        for _, cells in PATTERNS:
+            table = [0.0]
+            for i, j in cells:
+                weight = cell_weight(i, j) / coverage[i * SIZE + j]
+                table = table + [v + weight for v in table] + [v - weight for v in table]
+            weights.extend(table)
+        weights.append(0.0)
+
+        return weights
+
+    @staticmethod
+    def read(path):
+        with open(path, 'rb') as f:
+            magic, version, stages, nr_weights = PatternEvaluator.HEADER.unpack(f.read(PatternEvaluator.HEADER.size))
+            if magic != PatternEvaluator.MAGIC or version != PatternEvaluator.VERSION:
+                raise ValueError('{} is not a pattern weight file'.format(path))
+            if nr_weights != NR_WEIGHTS + 1:
+                raise ValueError('{} has {} weights per stage, expected {}'.format(path, nr_weights, NR_WEIGHTS + 1))
+
+            weights = array('f')
+            weights.fromfile(f, stages * nr_weights)
+
+        return stages, weights
+
+    # stage of a position with discs discs on the board, from 0 to stages - 1
+    @staticmethod
+    def stage(discs, stages):
+        return (discs - 4) * stages // (SIZE * SIZE - 3)
+
+    # predicted final disc difference for the first player, indices as given by instance_indices
+    def evaluate(self, indices, discs):
+        stage = PatternEvaluator.stage(discs, self.stages)
+        score = self.biases[stage] + sum(map(getitem, self.tables[stage], indices))
+        return max(-64.0, min(64.0, score))
+
+
+# weights holds stages * (NR_WEIGHTS + 1) floats, stage by stage
+def write_patterns(path, stages, weights):
+    weights = array('f', weights)
+    if len(weights) != stages * (NR_WEIGHTS + 1):
+        raise ValueError('expected {} weights, got {}'.format(stages * (NR_WEIGHTS + 1), len(weights)))
+
+    with open(path, 'wb') as f:
+        f.write(PatternEvaluator.HEADER.pack(PatternEvaluator.MAGIC, PatternEvaluator.VERSION, stages, NR_WEIGHTS + 1))
+        weights.tofile(f)
@@ -0,0 +1,154 @@
+import mmap
+import os
+import struct
+
+
+# file layout: a header, then one record per game appended when the game ends: the game header, every
+# move as a square index (one byte, two on boards of 255 cells or more, the largest value for a pass)
+# and, if the file keeps positions, the position before every move with the score of the search that
+# chose the move
+class Records:
+    MAGIC = b'RVGR'
+    VERSION = 1
+    HEADER = struct.Struct('<4sHBBB')  # magic, version, rows, columns, flags
+    GAME = struct.Struct('<HhB')  # number of moves, final disc difference for the first player, flags
+    POSITION = struct.Struct('<QQh')  # first player's discs, second player's discs, score * 100
+
+    WITH_POSITIONS = 1  # file flag
+    FINISHED = 1  # game flag, unset for an abandoned game
+    NO_SCORE = -32768  # the move was not chosen by a search
+
+    # struct of one move for a board of nr_row x nr_col
+    @staticmethod
+    def move_struct(nr_row, nr_col):
+        return struct.Struct('<B' if nr_row * nr_col < 255 else '<H')
+
+
+# appends games to a record file, creating it if needed
+class RecordWriter:
+    def __init__(self, path, nr_row, nr_col, positions=False):
+        if positions and nr_row * nr_col > 64:
+            raise ValueError('positions can only be recorded on boards of at most 64 cells')
+
+        self.path = path
+        self.positions = positions
+        self.move = Records.move_struct(nr_row, nr_col)
+        self.pass_move = (1 << (8 * self.move.size)) - 1
+        flags = Records.WITH_POSITIONS if positions else 0
+
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(Records.HEADER.pack(Records.MAGIC, Records.VERSION, nr_row, nr_col, flags))
+            self.file.flush()
+        else:
+            with open(path, 'rb') as f:
+                header = f.read(Records.HEADER.size)
+            if len(header) != Records.HEADER.size or \
+                    Records.HEADER.unpack(header) != (Records.MAGIC, Records.VERSION, nr_row, nr_col, flags):
+                self.file.close()
+                raise ValueError('{} is not a record file for this board and position setting'.format(path))
+
+    def close(self):
+        self.file.close()
+
+    # moves are squares, None for a pass; positions, needed if the file keeps them, are
+    # (first player's discs, second player's discs, score or None) before every move
+    def write_game(self, moves, result, finished=True, positions=None):
+        if self.positions and (positions is None or len(positions) != len(moves)):
+            raise ValueError('expected one position per move')
+
+        data = [Records.GAME.pack(len(moves), result, Records.FINISHED if finished else 0)]
+        data.extend(self.move.pack(self.pass_move if sq is None else sq) for sq in moves)
+        if self.positions:
+            for p_max, p_min, score in positions:
+                score = Records.NO_SCORE if score is None else max(-32767, min(32767, round(score * 100)))
+                data.append(Records.POSITION.pack(p_max, p_min, score))
+
+        # one write per game, a crash never leaves half a game behind
+        self.file.write(b''.join(data))
+        self.file.flush()
+
+
+# reads a record file in place through mmap
+class RecordReader:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) else b''
+
+        if len(self.data) < Records.HEADER.size:
+            self.close()
+            raise ValueError('{} is not a record file'.format(path))
+        magic, version, self.nr_row, self.nr_col, flags = Records.HEADER.unpack_from(self.data, 0)
+        if magic != Records.MAGIC or version != Records.VERSION:
+            self.close()
+            raise ValueError('{} is not a record file of version {}'.format(path, Records.VERSION))
+
+        self.positions = bool(flags & Records.WITH_POSITIONS)
+        self.move = Records.move_struct(self.nr_row, self.nr_col)
+        self.pass_move = (1 << (8 * self.move.size)) - 1
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    # (offset of the game header, number of moves, result, flags) of every game, reading only the headers
+    def game_offsets(self):
+        offset = Records.HEADER.size
+        while offset < len(self.data):
+            nr_moves, result, flags = Records.GAME.unpack_from(self.data, offset)
+            yield offset, nr_moves, result, flags
+            offset += Records.GAME.size + nr_moves * self.move.size
+            if self.positions:
+                offset += nr_moves * Records.POSITION.size
+
+    # (moves, final disc difference for the first player, finished) of every game, moves as squares
+    # with None for a pass
+    def games(self):
+        for offset, nr_moves, result, flags in self.game_offsets():
+            start = offset + Records.GAME.size
+            moves = [sq if sq != self.pass_move else None
+                     for (sq,) in self.move.iter_unpack(self.data[start:start + nr_moves * self.move.size])]
+            yield moves, result, bool(flags & Records.FINISHED)
+
+    def __iter__(self):
+        return self.games()
+
+    # lazily, (first player's discs, second player's discs, score or None, final result) of every
+    # stored position
+    def iter_positions(self):
+        if not self.positions:
+            raise ValueError('{} has no positions, replay its games instead'.format(self.path))
+
+        for offset, nr_moves, result, _ in self.game_offsets():
+            start = offset + Records.GAME.size + nr_moves * self.move.size
+            for p_max, p_min, score in Records.POSITION.iter_unpack(self.data[start:start + nr_moves * Records.POSITION.size]):
+                yield p_max, p_min, None if score == Records.NO_SCORE else score / 100, result
+
+    # every stored position as NumPy arrays: 'p_max' and 'p_min' discs, 'score' * 100 (Records.NO_SCORE
+    # if unknown) and the game's 'result', viewed from the mapped file without parsing every position
+    def position_arrays(self):
+        try:
+            import numpy as np  # imported here, only this method needs NumPy
+        except ImportError:
+            raise Exception('position_arrays needs NumPy')
+        if not self.positions:
+            raise ValueError('{} has no positions, replay its games instead'.format(self.path))
+
+        dtype = np.dtype([('p_max', '<u8'), ('p_min', '<u8'), ('score', '<i2')])
+        blocks = []
+        results = []
+        for offset, nr_moves, result, _ in self.game_offsets():
+            if nr_moves:
+                start = offset + Records.GAME.size + nr_moves * self.move.size
+                blocks.append(np.frombuffer(self.data, dtype=dtype, count=nr_moves, offset=start))
+                results.append(np.full(nr_moves, result, dtype=np.int16))
+
+        positions = np.concatenate(blocks) if blocks else np.zeros(0, dtype=dtype)
+        return {
+            'p_max': positions['p_max'],
+            'p_min': positions['p_min'],
+            'score': positions['score'],
+            'result': np.concatenate(results) if results else np.zeros(0, dtype=np.int16),
+        }
@@ -0,0 +1,362 @@
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import multiprocessing
+import sys
+import threading
+
+from core import PLAYERS, AI, Bitboard, Game, GameState, SearchConfig, SearchTimeout, parse_config
+
+# line protocol, one command per line, every command but go and quit is answered at once by one line:
+#   new                        start position
+#   position <text> <player>   board as GameState.to_text, player 1 or X, 2 or O
+#   play <i> <j> | play pass   plays a move of the player to move
+#   set <key>=<value> ...      search settings of this session, keys as in core.CONFIG_KEYS but
+#                              tt_entries, which --tt-entries fixes for the whole server
+#   show                       -> position <text> <player>
+#   go                         queues a search, answered once it is done by
+#                              bestmove <i> <j> | pass | none, then score, depth and nodes
+#   stop                       the pending search answers now with the best move found so far
+#   ping                       -> pong
+#   quit                       ends the session
+# a failed command is answered by error <message>, busy when the search queue is full
+
+
+# state of a server worker process
+server_ai = None
+stop_flags = None
+
+
+def init_server_worker(tt_entries, flags):
+    global server_ai, stop_flags
+    server_ai = AI(tt_entries)
+    stop_flags = flags
+
+
+# depth 1 alpha-beta, the answer when a search is stopped before it has a move
+def quick_move(ai, game_state, config):
+    ai.request_stop(False)
+    ai.set_evaluation(config)
+    return ai.alpha_beta(game_state, 1, Game.MIN_SCORE, Game.MAX_SCORE)
+
+
+# runs in a worker, a thread watches stop_flags[slot] and interrupts the search when it is set;
+# returns (score, square or None, depth, nodes)
+def server_search(boards, current_player, config, slot):
+    ai = server_ai
+    game_state = GameState(current_player, boards=boards)
+    start_nodes = ai.nodes
+    done = threading.Event()
+
+    def watch():
+        while not done.wait(Server.STOP_POLL):
+            if stop_flags[slot]:
+                ai.request_stop()
+                return
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        try:
+            score, new_state = ai.make_move(game_state, config)
+            depth = ai.stats.depth
+        except SearchTimeout:  # fixed depth searches and the endgame solver have nothing to show before they end
+            score, new_state = quick_move(ai, game_state, config)
+            depth = 1
+        sq = game_state.played_square(new_state)
+        if sq is None and game_state.can_advance():  # an MCTS stopped before its first playout
+            score, new_state = quick_move(ai, game_state, config)
+            sq = game_state.played_square(new_state)
+            depth = 1
+    finally:
+        done.set()
+        watcher.join()
+        ai.request_stop(False)
+
+    return score, sq, depth, ai.nodes - start_nodes
+
+
+# a search asked for by a session, queued until a worker is free
+class SearchRequest:
+    def __init__(self, game_state, config):
+        self.game_state = game_state
+        self.config = config
+        self.stop = asyncio.Event()
+        self.slot = None
+
+
+class Server:
+    STOP_POLL = 0.005  # seconds between two looks at the stop flag during a search
+    MAX_QUEUE = 1024  # searches waiting for a worker before go is answered with busy
+
+    def __init__(self, workers=None, tt_entries=None, max_queue=None):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.max_queue = Server.MAX_QUEUE if max_queue is None else max_queue
+        self.queued = 0
+
+        # one stop flag per search running at the same time, a search takes a free slot
+        self.stop_flags = multiprocessing.Array('b', self.workers, lock=False)
+        self.free_slots = list(range(self.workers))
+        self.slots = asyncio.Semaphore(self.workers)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_server_worker,
+                                        initargs=(Game.TT_ENTRIES if tt_entries is None else tt_entries,
+                                                  self.stop_flags))
+
+        # answers searches stopped while still queued
+        self.ai = AI(1 << 10)
+
+        # the workers are forked here: a worker forked later closes its copy of stdin on startup, which
+        # waits forever if the thread reading stdin held its lock at the time of the fork
+        for future in [self.pool.submit(int) for _ in range(self.workers)]:
+            future.result()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    def is_full(self):
+        return self.queued >= self.max_queue
+
+    # queues the request, counted at once so that a burst of go commands cannot overfill the queue
+    def submit(self, request):
+        self.queued += 1
+        return self.search(request)
+
+    # (score, square or None, depth, nodes) of a submitted request
+    async def search(self, request):
+        acquire = asyncio.ensure_future(self.slots.acquire())
+        stopped = asyncio.ensure_future(request.stop.wait())
+        try:
+            await asyncio.wait((acquire, stopped), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self.queued -= 1
+            stopped.cancel()
+
+        if not acquire.done():
+            acquire.cancel()
+            start_nodes = self.ai.nodes
+            score, new_state = quick_move(self.ai, request.game_state, request.config)
+            return score, request.game_state.played_square(new_state), 1, self.ai.nodes - start_nodes
+
+        slot = self.free_slots.pop()
+        request.slot = slot
+        self.stop_flags[slot] = request.stop.is_set()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.pool, server_search, request.game_state.boards, request.game_state.current_player,
+                request.config, slot)
+        finally:
+            request.slot = None
+            self.stop_flags[slot] = 0
+            self.free_slots.append(slot)
+            self.slots.release()
+
+    def stop(self, request):
+        request.stop.set()
+        if request.slot is not None:
+            self.stop_flags[request.slot] = 1
+
+
+# one game and its search settings, fed by one stream of commands
+class Session:
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.game_state = GameState()
+        self.config = SearchConfig(workers=1)
+        self.request = None
+        self.answer_task = None
+        self.closed = False
+
+    async def send(self, line):
+        if self.closed:
+            return
+        try:
+            self.writer.write((line + '\n').encode())
+            # a client that does not read its answers is not read from either
+            await self.writer.drain()
+        except ConnectionError:
+            self.closed = True
+
+    async def run(self):
+        try:
+            while True:
+                try:
+                    line = await self.reader.readline()
+                except ValueError:  # longer than the stream limit, what was read of it is dropped
+                    await self.send('error line too long')
+                    continue
+                if not line:
+                    break
+                words = line.decode(errors='replace').split()
+                if not words:
+                    continue
+                if words[0] == 'quit':
+                    break
+                reply = self.handle(words)
+                if reply is not None:
+                    await self.send(reply)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            # a search still pending answers at once so that its worker is free again
+            if self.request is not None:
+                self.server.stop(self.request)
+                await self.answer_task
+            self.closed = True
+            self.writer.close()
+
+    # the answer to a command, None for a go that answers later from its own task
+    def handle(self, words):
+        command, args = words[0], words[1:]
+        if command == 'ping':
+            return 'pong'
+        if command == 'stop':
+            if self.request is not None:
+                self.server.stop(self.request)
+            return 'ok'
+        if command == 'show':
+            return 'position {} {}'.format(self.game_state.to_text(), self.game_state.current_player)
+        if self.request is not None:
+            return 'error searching, stop first'
+
+        if command == 'new':
+            self.game_state = GameState()
+        elif command == 'position':
+            if len(args) != 2 or args[1] not in PLAYERS:
+                return 'error expected position <text> <player>'
+            try:
+                self.game_state = GameState.from_text(args[0], PLAYERS[args[1]])
+            except ValueError as e:
+                return 'error {}'.format(e)
+        elif command == 'play':
+            return self.play(args)
+        elif command == 'set':
+            return self.set(args)
+        elif command == 'go':
+            return self.go()
+        else:
+            return 'error unknown command {}'.format(command)
+
+        return 'ok'
+
+    def play(self, args):
+        if args == ['pass']:
+            if not self.game_state.must_pass():
+                return 'error cannot pass'
+            self.game_state = self.game_state.pass_turn()
+            return 'ok'
+
+        try:
+            x, y = int(args[0]), int(args[1])
+        except (IndexError, ValueError):
+            return 'error expected play <i> <j> or play pass'
+        valid, new_state = self.game_state.make_move(x, y)
+        if not valid:
+            return 'error illegal move'
+        self.game_state = new_state
+        return 'ok'
+
+    # all the settings or, if one is wrong, none of them; the table size is fixed by --tt-entries
+    def set(self, args):
+        if any(arg.partition('=')[0] == 'tt_entries' for arg in args):
+            return 'error tt_entries is set for the whole server by --tt-entries'
+        try:
+            self.config = parse_config(','.join(args), self.config)
+        except ValueError as e:
+            return 'error {}'.format(e)
+        return 'ok'
+
+    def go(self):
+        if self.game_state.is_final_state():
+            return 'bestmove none'
+        if self.game_state.must_pass():
+            return 'bestmove pass'
+        if self.server.is_full():
+            return 'busy'
+
+        self.request = SearchRequest(self.game_state, self.config)
+        self.answer_task = asyncio.ensure_future(self.answer(self.request, self.server.submit(self.request)))
+        return None
+
+    async def answer(self, request, search):
+        try:
+            score, sq, depth, nodes = await search
+            move = 'pass' if sq is None else '{} {}'.format(*Bitboard.coordinates(sq))
+            line = 'bestmove {} score {:.2f} depth {} nodes {}'.format(move, score, depth, nodes)
+        except Exception as e:
+            line = 'error search failed: {}'.format(e)
+        finally:
+            self.request = None
+        await self.send(line)
+
+
+# stdin and stdout as the reader and writer of a session, stdin is read on a thread so that it can be a
+# terminal, a pipe or a file alike
+class StdioStream:
+    def __init__(self):
+        self.input = sys.stdin.buffer
+        self.output = sys.stdout.buffer
+
+    async def readline(self):
+        return await asyncio.get_running_loop().run_in_executor(None, self.input.readline)
+
+    def write(self, data):
+        self.output.write(data)
+
+    async def drain(self):
+        self.output.flush()
+
+    def close(self):
+        self.output.flush()
+
+
+async def serve_stdio(server):
+    stream = StdioStream()
+    await Session(server, stream, stream).run()
+
+
+async def serve(server, host, port, stdio):
+    async def client(reader, writer):
+        await Session(server, reader, writer).run()
+
+    tcp = None
+    if port is not None:
+        tcp = await asyncio.start_server(client, host, port)
+        print('listening on {}'.format(', '.join('{}:{}'.format(*s.getsockname()[:2]) for s in tcp.sockets)),
+              file=sys.stderr, flush=True)
+
+    try:
+        if stdio:
+            await serve_stdio(server)
+        else:
+            await tcp.serve_forever()
+    finally:
+        if tcp is not None:
+            tcp.close()
+        server.close()
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Engine server: many games at once over stdin/stdout or TCP')
+
+    parser.add_argument('--port', type=int, default=None, help='Also serve TCP clients on this port')
+    parser.add_argument('--host', default='127.0.0.1', help='Address the TCP server listens on')
+    parser.add_argument('--stdio', default=None, choices=['0', '1'],
+                        help='Serve a session on stdin/stdout, on by default without --port')
+    parser.add_argument('--workers', type=int, default=None, help='Processes running searches')
+    parser.add_argument('--max-queue', dest='max_queue', type=int, default=None,
+                        help='Searches waiting for a worker before go is answered with busy')
+    parser.add_argument('--tt-entries', dest='tt_entries', type=int, default=None,
+                        help='Transposition table size of every worker')
+
+    args = parser.parse_args()
+    stdio = args.port is None if args.stdio is None else args.stdio == '1'
+
+    async def main():
+        await serve(Server(args.workers, args.tt_entries, args.max_queue), args.host, args.port, stdio)
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass